@@ -0,0 +1,170 @@
+# Benchmark the momentum pipeline on synthetic universes, outside Streamlit.
+# For every universe size and history length a synthetic tickers_data folder is generated,
+# then each stage is timed (best of --repeat runs) and run once more under tracemalloc for
+# its peak Python/numpy allocation. Results are written as JSON so runs can be compared.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.synthetic import synthetic_universe, write_universe
+from constants.config import memory_budget, panel_dtype
+from momentum.ingest import ensure_panel
+from momentum.metrics import WINDOW, calculate_returns, metrics_table, rolling_metrics
+from momentum.profiling import Profiler
+from momentum.store import load_close
+from momentum.strategies import (simulate_investment_strategy_1, simulate_investment_strategy_2,
+                                 simulate_investment_strategy_weekly)
+from momentum.weekly import WeeklyStats, calculate_weekly_returns
+
+TICKERS = [100, 500, 2000, 5000]
+YEARS = [2, 5, 10, 20]
+STAGES = ['load', 'calculate_returns', 'rolling_metrics', 'calculate_weekly_returns', 'weekly_stats',
+          'simulate_investment_strategy_1', 'simulate_investment_strategy_2', 'simulate_investment_strategy_weekly']
+END_DATE = '2024-07-26'
+AS_OF = '2024-07-27'
+
+
+# Best wall time over `repeat` runs, plus the tracemalloc peak of one extra run.
+# The first run is profiled, so each result also carries its inner stages and call counts.
+def measure(stage, repeat=1, memory=True, setup=None):
+    seconds = []
+    for run in range(repeat):
+        if setup:
+            setup()
+        profiler = Profiler('benchmark').start() if run == 0 else None
+        start = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - start)
+        if profiler:
+            report = profiler.stop().report()
+
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            stage()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'seconds': min(seconds),
+        'mean_seconds': sum(seconds) / len(seconds),
+        'peak_memory_mb': None if peak is None else peak / 2 ** 20,
+        'stages': report['stages'],
+        'counters': report['counters'],
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': pd.Timestamp.now('UTC').isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'panel_dtype': panel_dtype,
+        'memory_budget': memory_budget,
+    }
+
+
+# Run the selected stages on one synthetic universe; returns one result row per stage
+def benchmark_universe(n_tickers, years, work_dir, stages=STAGES, repeat=1, memory=True, seed=0):
+    data_dir = os.path.join(work_dir, 'tickers_data')
+    history_dir = os.path.join(work_dir, 'history')
+    panel_dir = os.path.join(work_dir, 'panel')
+    write_universe(synthetic_universe(n_tickers, years, END_DATE, seed), data_dir, AS_OF)
+
+    # Loading starts from the CSV snapshots every run: ingest, build the panel, read Close
+    def reset():
+        shutil.rmtree(history_dir, ignore_errors=True)
+        shutil.rmtree(panel_dir, ignore_errors=True)
+
+    def load():
+        ensure_panel(panel_dir, data_dir, history_dir)
+        return load_close(path=panel_dir, as_of=AS_OF)
+
+    timed = {}
+    if 'load' in stages:
+        timed['load'] = measure(load, repeat, memory, setup=reset)
+    close = load()
+    tickers = list(close.columns)
+    tickers_data = metrics_table(rolling_metrics(close, close.index[-1:])[0], close.columns)
+    # The reference implementations run per ticker on each ticker's own frame
+    histories = {ticker: close[ticker].dropna().to_frame('Close') for ticker in tickers}
+
+    stage_functions = {
+        'calculate_returns': lambda: [calculate_returns(histories[t][-WINDOW:], t) for t in tickers],
+        'rolling_metrics': lambda: metrics_table(rolling_metrics(close, close.index[-1:])[0], close.columns),
+        'calculate_weekly_returns': lambda: [calculate_weekly_returns(histories[t], t) for t in tickers],
+        'weekly_stats': lambda: WeeklyStats(close).table(close.index[-1]),
+        'simulate_investment_strategy_1': lambda: simulate_investment_strategy_1(close, tickers_data.copy(),
+                                                                                 end_date=END_DATE),
+        'simulate_investment_strategy_2': lambda: simulate_investment_strategy_2(close, tickers, end_date=END_DATE),
+        'simulate_investment_strategy_weekly': lambda: simulate_investment_strategy_weekly(close, tickers,
+                                                                                           end_date=END_DATE),
+    }
+    for stage in stages:
+        if stage in stage_functions:
+            timed[stage] = measure(stage_functions[stage], repeat, memory)
+
+    panel_mb = close.memory_usage(index=False).sum() / 2 ** 20
+    return [{'tickers': n_tickers, 'years': years, 'rows': len(close), 'panel_mb': panel_mb, 'stage': stage,
+             **timed[stage]}
+            for stage in stages]
+
+
+def run_benchmarks(tickers=TICKERS, years=YEARS, stages=STAGES, repeat=1, memory=True, seed=0, work_dir=None,
+                   log=print):
+    results = []
+    for n_tickers in tickers:
+        for n_years in years:
+            universe_dir = tempfile.mkdtemp(prefix=f'momentum_{n_tickers}x{n_years}y_', dir=work_dir)
+            try:
+                for row in benchmark_universe(n_tickers, n_years, universe_dir, stages, repeat, memory, seed):
+                    results.append(row)
+                    if log:
+                        memory_mb = '' if row['peak_memory_mb'] is None else f"{row['peak_memory_mb']:10.1f} MB"
+                        log(f"{n_tickers:>6} tickers {n_years:>3}y  {row['stage']:<38}{row['seconds']:10.3f} s {memory_mb}")
+            finally:
+                shutil.rmtree(universe_dir, ignore_errors=True)
+    return {'environment': environment(), 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time and memory-profile the momentum pipeline on synthetic universes')
+    parser.add_argument('--tickers', nargs='+', type=int, default=TICKERS)
+    parser.add_argument('--years', nargs='+', type=int, default=YEARS)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run of each stage')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None, help='where the synthetic universes are generated')
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.tickers, args.years, args.stages, args.repeat, not args.no_memory, args.seed,
+                            args.work_dir)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'wrote {len(report["results"])} results to {args.output}')
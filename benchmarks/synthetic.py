@@ -0,0 +1,85 @@
+# Synthetic OHLCV universes in the tickers_data layout: one <ticker>_<date>.csv snapshot per
+# ticker with the Date, Open, High, Low, Close, Volume, Dividends and Stock Splits columns
+# yfinance writes, dated at IST midnight. Prices follow a geometric random walk; some tickers
+# list part way through the range and some have missing sessions, like the real universe.
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from momentum.store import FIELDS
+
+
+def ticker_names(n_tickers):
+    return [f'SYN{i:05d}.NS' for i in range(n_tickers)]
+
+
+def trading_days(years, end_date):
+    end_date = pd.Timestamp(end_date)
+    return pd.bdate_range(end_date - pd.DateOffset(years=years), end_date, tz='Asia/Kolkata')
+
+
+# Yields (ticker, OHLCV frame) for n_tickers over the `years` up to end_date.
+# Tickers are drawn in blocks and streamed out, so the 5,000 x 20 year universes never
+# have to be held in memory at once.
+def synthetic_universe(n_tickers, years, end_date='2024-07-26', seed=0, late_listing=0.1, missing=0.002,
+                       block=250):
+    rng = np.random.default_rng(seed)
+    dates = trading_days(years, end_date)
+    n_days = len(dates)
+    names = ticker_names(n_tickers)
+
+    for offset in range(0, n_tickers, block):
+        size = min(block, n_tickers - offset)
+        drift = rng.normal(0.0004, 0.0004, size)
+        volatility = rng.uniform(0.01, 0.035, size)
+        log_returns = rng.standard_normal((n_days, size)) * volatility + drift
+        close = rng.uniform(20, 3000, size) * np.exp(np.cumsum(log_returns, axis=0))
+        open_ = close * np.exp(rng.normal(0, 0.005, (n_days, size)))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.008, (n_days, size))))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.008, (n_days, size))))
+        volume = rng.lognormal(11, 1.2, (n_days, size)).round()
+
+        # Listing day per ticker and sessions missing from individual histories
+        first_day = np.where(rng.random(size) < late_listing, rng.integers(0, n_days, size), 0)
+        present = (np.arange(n_days)[:, None] >= first_day) & (rng.random((n_days, size)) >= missing)
+
+        for i in range(size):
+            rows = present[:, i]
+            frame = pd.DataFrame({
+                'Open': open_[rows, i],
+                'High': high[rows, i],
+                'Low': low[rows, i],
+                'Close': close[rows, i],
+                'Volume': volume[rows, i].astype('int64'),
+                'Dividends': 0.0,
+                'Stock Splits': 0.0,
+            }, index=dates[rows], columns=FIELDS)
+            frame.index.name = 'Date'
+            yield names[offset + i], frame
+
+
+# Write (ticker, frame) pairs as snapshot CSVs taken on as_of; returns the tickers written
+def write_universe(universe, data_dir, as_of='2024-07-27'):
+    os.makedirs(data_dir, exist_ok=True)
+    written = []
+    for ticker, frame in universe:
+        frame.to_csv(os.path.join(data_dir, f'{ticker}_{as_of}.csv'))
+        written.append(ticker)
+    return sorted(written)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic universe of snapshot CSVs in the tickers_data layout')
+    parser.add_argument('data_dir')
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--end-date', default='2024-07-26')
+    parser.add_argument('--as-of', default='2024-07-27')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    written = write_universe(synthetic_universe(args.tickers, args.years, args.end_date, args.seed),
+                             args.data_dir, args.as_of)
+    print(f'wrote {len(written)} tickers to {args.data_dir}')
@@ -1,3 +1,30 @@
+import os
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Raw per-ticker CSV snapshots and the columnar panel built from them
+tickers_data_dir = os.environ.get('MOMENTUM_TICKERS_DATA', os.path.join(base_dir, 'tickers_data'))
+panel_dir = os.environ.get('MOMENTUM_PANEL_DIR', os.path.join(tickers_data_dir, 'panel'))
+# One canonical, de-duplicated history per ticker that new bars are merged into
+history_dir = os.environ.get('MOMENTUM_HISTORY_DIR', os.path.join(tickers_data_dir, 'history'))
+# Disk-backed result cache shared across Streamlit reruns and restarts, LRU-evicted past the size limit
+cache_dir = os.environ.get('MOMENTUM_CACHE_DIR', os.path.join(tickers_data_dir, 'cache'))
+cache_max_bytes = int(os.environ.get('MOMENTUM_CACHE_MAX_BYTES', 512 * 2 ** 20))
+# Precomputed analysis results (Parquet) that the apps load at startup when they match
+results_dir = os.environ.get('MOMENTUM_RESULTS_DIR', os.path.join(tickers_data_dir, 'results'))
+# Append one JSON profiling record per run to this file when set
+profile_log = os.environ.get('MOMENTUM_PROFILE_LOG')
+# Compact loading: dtype of the in-memory price panel and a memory ceiling in bytes (0 = none).
+# A panel over the ceiling is loaded with a warning, or spilled to a memory-mapped file in
+# spill_dir with MOMENTUM_OVER_BUDGET=spill; the metric kernels work in column chunks under it
+panel_dtype = os.environ.get('MOMENTUM_PANEL_DTYPE', 'float64')
+memory_budget = int(os.environ.get('MOMENTUM_MEMORY_BUDGET', 0))
+over_budget = os.environ.get('MOMENTUM_OVER_BUDGET', 'warn')
+spill_dir = os.environ.get('MOMENTUM_SPILL_DIR', os.path.join(tickers_data_dir, 'spill'))
+# Background analysis runs in the apps: worker threads shared by every session, and finished
+# runs kept in memory for sessions that ask for the same inputs
+job_workers = int(os.environ.get('MOMENTUM_JOB_WORKERS', 2))
+jobs_kept = int(os.environ.get('MOMENTUM_JOBS_KEPT', 8))
 
 nse= ['360ONE.NS','3MINDIA.NS','ABB.NS','ACC.NS','AIAENG.NS','APLAPOLLO.NS','AUBANK.NS','AARTIIND.NS','AAVAS.NS','ABBOTINDIA.NS','ACE.NS','ADANIENSOL.NS','ADANIENT.NS','ADANIGREEN.NS','ADANIPORTS.NS','ADANIPOWER.NS','ATGL.NS','AWL.NS','ABCAPITAL.NS','ABFRL.NS','AEGISLOG.NS','AETHER.NS','AFFLE.NS','AJANTPHARM.NS','APLLTD.NS','ALKEM.NS','ALKYLAMINE.NS','ALLCARGO.NS','ALOKINDS.NS','ARE&M.NS','AMBER.NS','AMBUJACEM.NS','ANANDRATHI.NS','ANGELONE.NS','ANURAS.NS','APARINDS.NS','APOLLOHOSP.NS','APOLLOTYRE.NS','APTUS.NS','ACI.NS','ASAHIINDIA.NS','ASHOKLEY.NS','ASIANPAINT.NS','ASTERDM.NS','ASTRAZEN.NS','ASTRAL.NS','ATUL.NS','AUROPHARMA.NS','AVANTIFEED.NS','DMART.NS','AXISBANK.NS','BEML.NS','BLS.NS','BSE.NS','BAJAJ-AUTO.NS','BAJFINANCE.NS','BAJAJFINSV.NS','BAJAJHLDNG.NS','BALAMINES.NS','BALKRISIND.NS','BALRAMCHIN.NS','BANDHANBNK.NS','BANKBARODA.NS','BANKINDIA.NS','MAHABANK.NS','BATAINDIA.NS','BAYERCROP.NS','BERGEPAINT.NS','BDL.NS','BEL.NS','BHARATFORG.NS','BHEL.NS','BPCL.NS','BHARTIARTL.NS','BIKAJI.NS','BIOCON.NS','BIRLACORPN.NS','BSOFT.NS','BLUEDART.NS','BLUESTARCO.NS','BBTC.NS','BORORENEW.NS','BOSCHLTD.NS','BRIGADE.NS','BRITANNIA.NS','MAPMYINDIA.NS','CCL.NS','CESC.NS','CGPOWER.NS','CIEINDIA.NS','CRISIL.NS','CSBBANK.NS','CAMPUS.NS','CANFINHOME.NS','CANBK.NS','CAPLIPOINT.NS','CGCL.NS','CARBORUNIV.NS','CASTROLIND.NS','CEATLTD.NS','CELLO.NS','CENTRALBK.NS','CDSL.NS','CENTURYPLY.NS','CENTURYTEX.NS','CERA.NS','CHALET.NS','CHAMBLFERT.NS','CHEMPLASTS.NS','CHENNPETRO.NS','CHOLAHLDNG.NS','CHOLAFIN.NS','CIPLA.NS','CUB.NS','CLEAN.NS','COALINDIA.NS','COCHINSHIP.NS','COFORGE.NS','COLPAL.NS','CAMS.NS','CONCORDBIO.NS','CONCOR.NS','COROMANDEL.NS','CRAFTSMAN.NS','CREDITACC.NS','CROMPTON.NS','CUMMINSIND.NS','CYIENT.NS','DCMSHRIRAM.NS','DLF.NS','DOMS.NS','DABUR.NS','DALBHARAT.NS','DATAPATTNS.NS','DEEPAKFERT.NS','DEEPAKNTR.NS','DELHIVERY.NS','DEVYANI.NS','DIVISLAB.NS','DIXON.NS','LALPATHLAB.NS','DRREDDY.NS','DUMMYSANOF.NS','EIDPARRY.NS','EIHOTEL.NS','EPL.NS','EASEMYTRIP.NS','EICHERMOT.NS','ELECON.NS','ELGIEQUIP.NS','EMAMILTD.NS','ENDURANCE.NS','ENGINERSIN.NS','EQUITASBNK.NS','ERIS.NS','ESCORTS.NS','EXIDEIND.NS','FDC.NS','NYKAA.NS','FEDERALBNK.NS','FACT.NS','FINEORG.NS','FINCABLES.NS','FINPIPE.NS','FSL.NS','FIVESTAR.NS','FORTIS.NS','GAIL.NS','GMMPFAUDLR.NS','GMRINFRA.NS','GRSE.NS','GICRE.NS','GILLETTE.NS','GLAND.NS','GLAXO.NS','GLS.NS','GLENMARK.NS','MEDANTA.NS','GPIL.NS','GODFRYPHLP.NS','GODREJCP.NS','GODREJIND.NS','GODREJPROP.NS','GRANULES.NS','GRAPHITE.NS','GRASIM.NS','GESHIP.NS','GRINDWELL.NS','GAEL.NS','FLUOROCHEM.NS','GUJGASLTD.NS','GMDCLTD.NS','GNFC.NS','GPPL.NS','GSFC.NS','GSPL.NS','HEG.NS','HBLPOWER.NS','HCLTECH.NS','HDFCAMC.NS','HDFCBANK.NS','HDFCLIFE.NS','HFCL.NS','HAPPSTMNDS.NS','HAPPYFORGE.NS','HAVELLS.NS','HEROMOTOCO.NS','HSCL.NS','HINDALCO.NS','HAL.NS','HINDCOPPER.NS','HINDPETRO.NS','HINDUNILVR.NS','HINDZINC.NS','POWERINDIA.NS','HOMEFIRST.NS','HONASA.NS','HONAUT.NS','HUDCO.NS','ICICIBANK.NS','ICICIGI.NS','ICICIPRULI.NS','ISEC.NS','IDBI.NS','IDFCFIRSTB.NS','IDFC.NS','IIFL.NS','IRB.NS','IRCON.NS','ITC.NS','ITI.NS','INDIACEM.NS','IBULHSGFIN.NS','INDIAMART.NS','INDIANB.NS','IEX.NS','INDHOTEL.NS','IOC.NS','IOB.NS','IRCTC.NS','IRFC.NS','INDIGOPNTS.NS','IGL.NS','INDUSTOWER.NS','INDUSINDBK.NS','NAUKRI.NS','INFY.NS','INOXWIND.NS','INTELLECT.NS','INDIGO.NS','IPCALAB.NS','JBCHEPHARM.NS','JKCEMENT.NS','JBMA.NS','JKLAKSHMI.NS','JKPAPER.NS','JMFINANCIL.NS','JSWENERGY.NS','JSWINFRA.NS','JSWSTEEL.NS','JAIBALAJI.NS','J&KBANK.NS','JINDALSAW.NS','JSL.NS','JINDALSTEL.NS','JIOFIN.NS','JUBLFOOD.NS','JUBLINGREA.NS','JUBLPHARMA.NS','JWL.NS','JUSTDIAL.NS','JYOTHYLAB.NS','KPRMILL.NS','KEI.NS','KNRCON.NS','KPITTECH.NS','KRBL.NS','KSB.NS','KAJARIACER.NS','KPIL.NS','KALYANKJIL.NS','KANSAINER.NS','KARURVYSYA.NS','KAYNES.NS','KEC.NS','KFINTECH.NS','KOTAKBANK.NS','KIMS.NS','LTF.NS','LTTS.NS','LICHSGFIN.NS','LTIM.NS','LT.NS','LATENTVIEW.NS','LAURUSLABS.NS','LXCHEM.NS','LEMONTREE.NS','LICI.NS','LINDEINDIA.NS','LLOYDSME.NS','LUPIN.NS','MMTC.NS','MRF.NS','MTARTECH.NS','LODHA.NS','MGL.NS','MAHSEAMLES.NS','M&MFIN.NS','M&M.NS','MHRIL.NS','MAHLIFE.NS','MANAPPURAM.NS','MRPL.NS','MANKIND.NS','MARICO.NS','MARUTI.NS','MASTEK.NS','MFSL.NS','MAXHEALTH.NS','MAZDOCK.NS','MEDPLUS.NS','METROBRAND.NS','METROPOLIS.NS','MINDACORP.NS','MSUMI.NS','MOTILALOFS.NS','MPHASIS.NS','MCX.NS','MUTHOOTFIN.NS','NATCOPHARM.NS','NBCC.NS','NCC.NS','NHPC.NS','NLCINDIA.NS','NMDC.NS','NSLNISP.NS','NTPC.NS','NH.NS','NATIONALUM.NS','NAVINFLUOR.NS','NESTLEIND.NS','NETWORK18.NS','NAM-INDIA.NS','NUVAMA.NS','NUVOCO.NS','OBEROIRLTY.NS','ONGC.NS','OIL.NS','OLECTRA.NS','PAYTM.NS','OFSS.NS','POLICYBZR.NS','PCBL.NS','PIIND.NS','PNBHOUSING.NS','PNCINFRA.NS','PVRINOX.NS','PAGEIND.NS','PATANJALI.NS','PERSISTENT.NS','PETRONET.NS','PHOENIXLTD.NS','PIDILITIND.NS','PEL.NS','PPLPHARMA.NS','POLYMED.NS','POLYCAB.NS','POONAWALLA.NS','PFC.NS','POWERGRID.NS','PRAJIND.NS','PRESTIGE.NS','PRINCEPIPE.NS','PRSMJOHNSN.NS','PGHH.NS','PNB.NS','QUESS.NS','RRKABEL.NS','RBLBANK.NS','RECLTD.NS','RHIM.NS','RITES.NS','RADICO.NS','RVNL.NS','RAILTEL.NS','RAINBOW.NS','RAJESHEXPO.NS','RKFORGE.NS','RCF.NS','RATNAMANI.NS','RTNINDIA.NS','RAYMOND.NS','REDINGTON.NS','RELIANCE.NS','RBA.NS','ROUTE.NS','SBFC.NS','SBICARD.NS','SBILIFE.NS','SJVN.NS','SKFINDIA.NS','SRF.NS','SAFARI.NS','MOTHERSON.NS','SANOFI.NS','SAPPHIRE.NS','SAREGAMA.NS','SCHAEFFLER.NS','SCHNEIDER.NS','SHREECEM.NS','RENUKA.NS','SHRIRAMFIN.NS','SHYAMMETL.NS','SIEMENS.NS','SIGNATURE.NS','SOBHA.NS','SOLARINDS.NS','SONACOMS.NS','SONATSOFTW.NS','STARHEALTH.NS','SBIN.NS','SAIL.NS','SWSOLAR.NS','STLTECH.NS','SUMICHEM.NS','SPARC.NS','SUNPHARMA.NS','SUNTV.NS','SUNDARMFIN.NS','SUNDRMFAST.NS','SUNTECK.NS','SUPREMEIND.NS','SUVENPHAR.NS','SUZLON.NS','SWANENERGY.NS','SYNGENE.NS','SYRMA.NS','TV18BRDCST.NS','TVSMOTOR.NS','TVSSCS.NS','TMB.NS','TANLA.NS','TATACHEM.NS','TATACOMM.NS','TCS.NS','TATACONSUM.NS','TATAELXSI.NS','TATAINVEST.NS','TATAMTRDVR.NS','TATAMOTORS.NS','TATAPOWER.NS','TATASTEEL.NS','TATATECH.NS','TTML.NS','TECHM.NS','TEJASNET.NS','NIACL.NS','RAMCOCEM.NS','THERMAX.NS','TIMKEN.NS','TITAGARH.NS','TITAN.NS','TORNTPHARM.NS','TORNTPOWER.NS','TRENT.NS','TRIDENT.NS','TRIVENI.NS','TRITURBINE.NS','TIINDIA.NS','UCOBANK.NS','UNOMINDA.NS','UPL.NS','UTIAMC.NS','UJJIVANSFB.NS','ULTRACEMCO.NS','UNIONBANK.NS','UBL.NS','UNITDSPR.NS','USHAMART.NS','VGUARD.NS','VIPIND.NS','VAIBHAVGBL.NS','VTL.NS','VARROC.NS','VBL.NS','MANYAVAR.NS','VEDL.NS','VIJAYA.NS','IDEA.NS','VOLTAS.NS','WELCORP.NS','WELSPUNLIV.NS','WESTLIFE.NS','WHIRLPOOL.NS','WIPRO.NS','YESBANK.NS','ZFCVINDIA.NS','ZEEL.NS','ZENSARTECH.NS','ZOMATO.NS','ZYDUSLIFE.NS','ECLERX.NS']
 
@@ -0,0 +1,176 @@
+# Headless analysis of a universe: the metrics tables and the three strategy simulations
+# as a flat set of named DataFrames that can be written to and read back from Parquet.
+# Precomputed result sets are stored one directory per key, where the key covers the
+# universe, its prices, the parameters and the code version, so a front end can check
+# whether a precomputed set matches what it would compute and load it instead.
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from constants.config import results_dir
+from momentum.cache import code_version, column_digests
+from momentum.dag import Graph
+from momentum.periods import rebalance_schedule
+from momentum.profiling import profiled
+from momentum.strategies import (overview_metrics, overview_weekly, simulate_investment_strategy_1,
+                                 simulate_investment_strategy_2, simulate_investment_strategy_weekly,
+                                 simulation_range)
+
+# Parts of an analysis; strategy_1 ranks on the metrics table
+PARTS = ('metrics', 'weekly_metrics', 'strategy_1', 'strategy_2', 'weekly')
+STRATEGIES = ('strategy_1', 'strategy_2', 'weekly')
+PART_FREQS = {'strategy_1': 'MS', 'strategy_2': 'MS', 'weekly': 'W-MON'}
+META = 'meta.json'
+
+
+# One simulator result tuple as named frames: <strategy>_summary, _returns, _returns_by_stock,
+# _top_10 and, for the trading strategies, _buying and _selling
+def strategy_frames(strategy, result):
+    total_amount, period_returns, returns_by_stock, top_10 = result[:4]
+    frames = {
+        f'{strategy}_summary': pd.DataFrame({'Total Amount': [total_amount]}),
+        f'{strategy}_returns': pd.DataFrame({'Period': list(period_returns),
+                                             'Return (%)': list(period_returns.values())}, columns=['Period', 'Return (%)']),
+        f'{strategy}_returns_by_stock': returns_by_stock,
+        f'{strategy}_top_10': top_10,
+    }
+    if len(result) > 4:
+        frames[f'{strategy}_buying'] = result[4]
+        frames[f'{strategy}_selling'] = result[5]
+    return frames
+
+
+# Inverse of strategy_frames, the tuple the simulator returned
+def strategy_result(results, strategy):
+    period_returns = results[f'{strategy}_returns']
+    result = (
+        float(results[f'{strategy}_summary']['Total Amount'].iloc[0]),
+        dict(zip(period_returns['Period'], period_returns['Return (%)'])),
+        results[f'{strategy}_returns_by_stock'],
+        results[f'{strategy}_top_10'],
+    )
+    if f'{strategy}_buying' in results:
+        result += (results[f'{strategy}_buying'], results[f'{strategy}_selling'])
+    return result
+
+
+def frame_names(parts):
+    names = []
+    for part in parts:
+        if part in STRATEGIES:
+            names += [f'{part}_summary', f'{part}_returns', f'{part}_returns_by_stock', f'{part}_top_10']
+            if part != 'strategy_1':
+                names += [f'{part}_buying', f'{part}_selling']
+        else:
+            names.append(part)
+    return names
+
+
+# Run the requested parts for the universe; returns {name: DataFrame}. The parts share one
+# computation graph, so intermediates they have in common are computed once. A progress
+# object (jobs.Job) receives each table with progress.frame(name, frame) as soon as it is
+# ready and each simulated period with progress.period(part, label, period_return, top_10).
+@profiled
+def analyze(close_panel, tickers_list, parts=PARTS, amount=100000, end_date=None, cache=None, progress=None):
+    _, end_date = simulation_range(end_date)
+    graph = Graph(close_panel, cache)
+    results = {}
+
+    def publish(frames):
+        results.update(frames)
+        if progress is not None:
+            for name, frame in frames.items():
+                progress.frame(name, frame)
+
+    def on_period(part):
+        return None if progress is None else functools.partial(progress.period, part)
+
+    if 'metrics' in parts or 'strategy_1' in parts:
+        publish({'metrics': overview_metrics(close_panel, cache, graph)})
+    if 'weekly_metrics' in parts:
+        publish({'weekly_metrics': overview_weekly(close_panel, cache, graph)})
+    if 'strategy_1' in parts:
+        publish(strategy_frames('strategy_1', simulate_investment_strategy_1(
+            close_panel, results['metrics'].copy(), amount, end_date, cache, graph, on_period('strategy_1'))))
+    if 'strategy_2' in parts:
+        publish(strategy_frames('strategy_2', simulate_investment_strategy_2(
+            close_panel, tickers_list, amount, end_date, cache, graph=graph, on_period=on_period('strategy_2'))))
+    if 'weekly' in parts:
+        publish(strategy_frames('weekly', simulate_investment_strategy_weekly(
+            close_panel, tickers_list, amount, end_date, cache, graph=graph, on_period=on_period('weekly'))))
+    return {name: results[name] for name in frame_names(parts) if name in results}
+
+
+# Number of rebalance periods each simulated part steps through, for progress displays
+def period_counts(parts=PARTS, end_date=None):
+    start_date, end_date = simulation_range(end_date)
+    return {part: len(rebalance_schedule(freq, start_date, end_date)[0])
+            for part, freq in PART_FREQS.items() if part in parts}
+
+
+# Identity of an analysis: universe, prices, parameters and code version
+def results_key(close_panel, tickers_list, amount=100000, end_date=None):
+    _, end_date = simulation_range(end_date)
+    payload = json.dumps([code_version(), list(tickers_list), list(column_digests(close_panel).items()),
+                          float(amount), str(end_date)], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+# Write one result set under path/<key>, keeping the `keep` most recent sets
+def write_results(results, key, path=results_dir, keep=4, **meta):
+    os.makedirs(path, exist_ok=True)
+    # A directory of its own per writer; hidden, so it is never listed as a result set
+    tmp_path = tempfile.mkdtemp(prefix=f'.{key}.', suffix='.tmp', dir=path)
+    for name, frame in results.items():
+        frame.to_parquet(os.path.join(tmp_path, f'{name}.parquet'))
+    with open(os.path.join(tmp_path, META), 'w') as f:
+        json.dump({'key': key, 'frames': sorted(results), 'created': pd.Timestamp.now('UTC').isoformat(), **meta},
+                  f, indent=1, default=str)
+
+    # Swap the finished directory in, so readers never see a partial result set
+    target = os.path.join(path, key)
+    shutil.rmtree(target, ignore_errors=True)
+    try:
+        os.replace(tmp_path, target)
+    except OSError:
+        # Another writer swapped in the same set first; keys identify the contents, so keep theirs
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    sets = sorted((entry for entry in os.scandir(path) if entry.is_dir() and not entry.name.startswith('.')),
+                  key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in sets[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return target
+
+
+# The frames of a precomputed result set, or None when there is no complete set for the key
+@profiled
+def read_results(key, parts=PARTS, path=results_dir):
+    directory = os.path.join(path, key)
+    if not os.path.exists(os.path.join(directory, META)):
+        return None
+    results = {}
+    for name in frame_names(parts):
+        file_path = os.path.join(directory, f'{name}.parquet')
+        if not os.path.exists(file_path):
+            return None
+        results[name] = pd.read_parquet(file_path)
+    return results
+
+
+# Precomputed results when a matching set exists, otherwise compute them
+def load_or_analyze(close_panel, tickers_list, parts=PARTS, amount=100000, end_date=None, cache=None,
+                    path=results_dir, progress=None):
+    results = read_results(results_key(close_panel, tickers_list, amount, end_date), parts, path)
+    if results is None:
+        return analyze(close_panel, tickers_list, parts, amount, end_date, cache, progress)
+    if progress is not None:
+        for name, frame in results.items():
+            progress.frame(name, frame)
+    return results
@@ -0,0 +1,108 @@
+# Array-level momentum backtest: rank tickers by Return to Risk Ratio at every rebalance
+# date, hold the top N and account for buys and sells in the portfolio ledger the Streamlit
+# simulators use.
+# prepare_backtest does the heavy, parameter-specific work once; simulate_backtest is cheap
+# and can be rerun for different top N / amounts on the same preparation.
+
+import numpy as np
+import pandas as pd
+
+from momentum.ledger import NO_COSTS, equity_curve, max_drawdown, rebalance_ledger
+from momentum.metrics import LOOKBACKS, WINDOW, rolling_metrics
+from momentum.periods import asof_prices, period_label, rebalance_schedule
+from momentum.profiling import profiled
+from momentum.weekly import WeeklyStats
+
+# 'rolling' ranks on the 1y/6m/3m metrics of strategy 2, 'weekly' on the weekly stats
+SIGNALS = ('rolling', 'weekly')
+
+
+# Default backtest range: the year up to the last day in the panel
+def default_range(close, start_date=None, end_date=None):
+    if end_date is None:
+        end_date = close.index[-1].ceil('D')
+    if start_date is None:
+        start_date = pd.Timestamp(end_date) - pd.DateOffset(years=1)
+    return pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+
+# Ratio used for ranking at each period end, plus which tickers have data there
+def rebalance_scores(close, signal, period_ends, window=WINDOW, lookbacks=LOOKBACKS):
+    if signal == 'rolling':
+        metrics = rolling_metrics(close, period_ends, window, lookbacks)
+        return metrics[:, :, -1], ~np.isnan(metrics[:, :, 0])
+    if signal == 'weekly':
+        weekly_stats = WeeklyStats(close)
+        scores = np.array([weekly_stats.advance(end)[2] for end in period_ends]).reshape(len(period_ends), -1)
+        return scores, np.ones_like(scores, dtype=bool)
+    raise ValueError(f'Unknown signal: {signal}')
+
+
+# Everything the simulation needs that does not depend on top N or the amount invested
+@profiled
+def prepare_backtest(close, signal='rolling', freq='MS', window=WINDOW, lookbacks=LOOKBACKS,
+                     start_date=None, end_date=None):
+    start_date, end_date = default_range(close, start_date, end_date)
+    starts, ends = rebalance_schedule(freq, start_date, end_date)
+    scores, available = rebalance_scores(close, signal, ends, window, lookbacks)
+    start_prices = asof_prices(close, starts)
+    end_prices = asof_prices(close, ends)
+    return {
+        'tickers': list(close.columns),
+        'labels': [period_label(start, freq) for start in starts],
+        'scores': scores,
+        'available': available,
+        'start_prices': start_prices,
+        'end_prices': end_prices,
+        'returns': (end_prices - start_prices) / start_prices * 100,
+    }
+
+
+# Positions of the top n scores, highest first; ties keep column order like nlargest
+def top_n_positions(scores, n):
+    order = np.argsort(-scores, kind='stable')
+    return order[:min(n, np.count_nonzero(~np.isnan(scores)))]
+
+
+# Hold the top n each period: sell names that drop out at the period end price, buy new
+# names with amount / n at the period start price; the ledger values cash plus holdings.
+# Periods where no ticker has data yet are skipped, as in the simulators.
+@profiled
+def simulate_backtest(prepared, top_n=10, amount=100000, costs=NO_COSTS):
+    n_periods, n_tickers = prepared['scores'].shape
+    selected = np.zeros((n_periods, n_tickers), dtype=bool)
+    active = prepared['available'].any(axis=1)
+    labels, period_returns, turnover, selections = [], [], [], []
+
+    held = np.zeros(n_tickers, dtype=bool)
+    for p in np.flatnonzero(active):
+        top = top_n_positions(np.where(prepared['available'][p], prepared['scores'][p], np.nan), top_n)
+        selected[p, top] = True
+        top_returns = prepared['returns'][p, top]
+        bought = selected[p] & ~held
+        held = selected[p]
+
+        labels.append(prepared['labels'][p])
+        period_returns.append(np.nanmean(top_returns) if np.any(~np.isnan(top_returns)) else np.nan)
+        turnover.append(bought.sum() / top.size if top.size else np.nan)
+        selections.append(top)
+
+    ledger = rebalance_ledger(selected, prepared['start_prices'], prepared['end_prices'], amount, costs, active)
+    return {
+        'final_amount': ledger['value'][-1] if n_periods else 0.0,
+        'period_returns': pd.Series(period_returns, index=labels, dtype='float64'),
+        'turnover': pd.Series(turnover, index=labels, dtype='float64'),
+        'selections': selections,
+        'ledger': ledger,
+    }
+
+
+# Backtest with the daily equity curve (Equity, Invested) and its maximum drawdown
+def run_backtest(close, signal='rolling', freq='MS', top_n=10, window=WINDOW, lookbacks=LOOKBACKS,
+                 amount=100000, start_date=None, end_date=None, costs=NO_COSTS):
+    prepared = prepare_backtest(close, signal, freq, window, lookbacks, start_date, end_date)
+    result = simulate_backtest(prepared, top_n, amount, costs)
+    starts, ends = rebalance_schedule(freq, *default_range(close, start_date, end_date))
+    result['equity'] = equity_curve(result['ledger'], close, starts, ends)
+    result['max_drawdown'] = max_drawdown(result['equity'])
+    return result
@@ -0,0 +1,198 @@
+# Disk-backed, content-addressed result cache.
+# Keys are hashes of everything a result depends on: the name of the computation, its
+# parameters, the contents of the price data it reads and the version of this package's
+# code, so entries never go stale and survive restarts. Per-ticker results of one computation
+# and its parameters are stored together in one entry, keyed by ticker and price digest, so a
+# changed universe only computes the tickers that are new or changed and a call reads and
+# writes a single file.
+# Entries are evicted least recently used first once the cache grows past its size limit.
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from constants.config import cache_dir, cache_max_bytes
+from momentum.profiling import count
+from momentum.store import replacing
+
+logger = logging.getLogger(__name__)
+
+package_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+# Hash of the package sources, so any code change invalidates every cached result
+@lru_cache(maxsize=1)
+def code_version():
+    digest = hashlib.sha1()
+    for file_path in sorted(glob.glob(os.path.join(package_dir, '*.py'))):
+        with open(file_path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Content digest of every ticker's prices in a panel, {ticker: digest}
+def column_digests(close):
+    index = close.index.values.astype('datetime64[ns]').view('int64')
+    # One row per ticker, read from the panel once
+    panel = np.ascontiguousarray(close.to_numpy(dtype='float64').T)
+    digests = {}
+    for ticker, values in zip(close.columns, panel):
+        valid = ~np.isnan(values)
+        digest = hashlib.sha1(index[valid].tobytes())
+        digest.update(values[valid].tobytes())
+        digests[ticker] = digest.hexdigest()
+    return digests
+
+
+class ResultCache:
+    def __init__(self, path=cache_dir, max_bytes=cache_max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        # Guards the size bookkeeping; background runs on several threads share one cache
+        self.lock = threading.Lock()
+
+    def key(self, *parts):
+        payload = json.dumps([code_version(), *parts], default=str, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def get(self, key, default=None):
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            count('cache.misses')
+            return default
+        except Exception:  # truncated, corrupt or written by incompatible code: recomputed and overwritten
+            logger.warning('unreadable cache entry %s', entry_path, exc_info=True)
+            self.misses += 1
+            count('cache.misses')
+            return default
+        # The modification time is the recency used for eviction
+        os.utime(entry_path)
+        self.hits += 1
+        count('cache.hits')
+        return value
+
+    def put(self, key, value):
+        os.makedirs(self.path, exist_ok=True)
+        entry_path = self.entry_path(key)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            try:
+                replaced = os.path.getsize(entry_path)
+            except OSError:
+                replaced = 0
+            with replacing(entry_path) as tmp_path:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(payload) - replaced
+            full = self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def entries(self):
+        entries = []
+        for entry_path in glob.glob(os.path.join(self.path, '*.pkl')):
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    # Drop least recently used entries until the cache is back under 90% of its limit
+    def evict(self):
+        with self.lock:
+            entries = sorted(self.entries())
+            size = sum(entry_size for _, entry_size, _ in entries)
+            for _, entry_size, entry_path in entries:
+                if size <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(entry_path)
+                except OSError:
+                    pass
+                size -= entry_size
+                count('cache.evictions')
+            self._size = size
+
+    def clear(self):
+        with self.lock:
+            for _, _, entry_path in self.entries():
+                os.remove(entry_path)
+            self._size = 0
+
+    # Per-ticker results of compute(close), an array with one entry per ticker along `axis`.
+    # The entry for (name, params) maps (ticker, price digest) to that ticker's result;
+    # compute only runs on the columns that are missing, and the entry is rewritten once
+    # with them, keeping only the latest prices of each ticker. digests (column_digests of
+    # close, or of a wider panel) saves hashing the prices again.
+    def columns(self, name, params, close, compute, axis=1, digests=None):
+        if close.shape[1] == 0:
+            return compute(close)
+        digests = column_digests(close) if digests is None else digests
+        key = self.key(name, params)
+        stored = self.get(key, {})
+        found = {}
+        for ticker in close.columns:
+            value = stored.get((ticker, digests[ticker]))
+            if value is not None:
+                found[ticker] = value
+
+        missing = [ticker for ticker in close.columns if ticker not in found]
+        count('cache.column_hits', len(found))
+        count('cache.column_misses', len(missing))
+        if missing:
+            computed = compute(close[missing])
+            replaced = set(missing)
+            entries = {entry: value for entry, value in stored.items() if entry[0] not in replaced}
+            for i, ticker in enumerate(missing):
+                found[ticker] = entries[ticker, digests[ticker]] = np.take(computed, i, axis=axis)
+            self.put(key, entries)
+        return np.stack([found[ticker] for ticker in close.columns], axis=axis)
+
+
+# ResultCache.columns when a cache is given, otherwise just compute(close)
+def cached_columns(cache, name, params, close, compute, axis=1, digests=None):
+    if cache is None:
+        return compute(close)
+    return cache.columns(name, params, close, compute, axis, digests)
+
+
+# Whole result of compute() keyed on the parameters and the prices of every ticker in close
+def cached_result(cache, name, params, close, compute, digests=None):
+    if cache is None:
+        return compute()
+    digests = column_digests(close) if digests is None else digests
+    universe = [(ticker, digests[ticker]) for ticker in close.columns]
+    return cache.get_or_compute(cache.key(name, params, universe), compute)
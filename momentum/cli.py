@@ -0,0 +1,132 @@
+# Command line entry point, `python -m momentum`:
+#   analyze     run the metrics tables and strategy simulations for a universe, write Parquet
+#   precompute  refresh prices and store the default views for the apps to load at startup,
+#               once or every day at a fixed time
+
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+from constants.config import nse, results_dir
+from momentum.analysis import PARTS, analyze, results_key, write_results
+from momentum.cache import ResultCache
+from momentum.ingest import ensure_panel
+from momentum.profiling import Profiler
+from momentum.store import load_close
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tickers(tickers):
+    if tickers is None:
+        return list(nse)
+    return [ticker.strip() for ticker in ','.join(tickers).split(',') if ticker.strip()]
+
+
+def run_analyze(args):
+    tickers = parse_tickers(args.tickers)
+    with Profiler('analyze') as profiler:
+        ensure_panel()
+        close_panel = load_close(tickers, as_of=args.as_of)
+        cache = None if args.no_cache else ResultCache()
+        results = analyze(close_panel, tickers, args.parts, args.amount, args.end_date, cache)
+        os.makedirs(args.output, exist_ok=True)
+        for name, frame in results.items():
+            frame.to_parquet(os.path.join(args.output, f'{name}.parquet'))
+    profiler.log()
+    missing = [ticker for ticker in tickers if ticker not in close_panel]
+    print(f'wrote {len(results)} tables for {close_panel.shape[1]} tickers to {args.output}')
+    if missing:
+        print(f'no data for {len(missing)} tickers: {", ".join(missing)}')
+
+
+# Refresh the data and store the default analysis for every as-of date the apps use
+def precompute(tickers=None, provider=None, as_of_dates=(None,), amount=100000, path=results_dir, keep=4):
+    tickers = list(nse) if tickers is None else tickers
+    with Profiler('precompute') as profiler:
+        if provider is None:
+            ensure_panel()
+        else:
+            from momentum.fetch import refresh
+
+            _, report = refresh(provider, tickers)
+            logger.info('fetch %s', report.summary())
+        cache = ResultCache()
+        written = []
+        for as_of in as_of_dates:
+            close_panel = load_close(tickers, as_of=as_of)
+            results = analyze(close_panel, tickers, PARTS, amount, cache=cache)
+            key = results_key(close_panel, tickers, amount)
+            written.append(write_results(results, key, path, keep, as_of=as_of, tickers=len(tickers)))
+    profiler.log()
+    return written
+
+
+# Seconds until the next local HH:MM
+def seconds_until(daily_at):
+    now = pd.Timestamp.now()
+    hour, minute = (int(part) for part in daily_at.split(':'))
+    target = now.normalize() + pd.Timedelta(hours=hour, minutes=minute)
+    if target <= now:
+        target += pd.Timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def run_precompute(args):
+    provider = None
+    if args.fetch == 'yfinance':
+        from momentum.fetch import YFinanceProvider
+        provider = YFinanceProvider()
+    elif args.fetch == 'local':
+        from momentum.fetch import LocalProvider
+        provider = LocalProvider()
+    # The latest view is always stored; --as-of dates are stored next to it
+    as_of_dates = list(dict.fromkeys([None, *(args.as_of or [])]))
+
+    while True:
+        if args.daily_at:
+            time.sleep(seconds_until(args.daily_at))
+        try:
+            for directory in precompute(parse_tickers(args.tickers), provider, as_of_dates, args.amount,
+                                        args.output, args.keep):
+                print(f'wrote {directory}')
+        except Exception:
+            if not args.daily_at:
+                raise
+            logger.exception('precompute failed, retrying at the next scheduled time')
+        if not args.daily_at:
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m momentum', description='Momentum analytics without Streamlit')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze_parser = commands.add_parser('analyze', help='run the analysis for a universe and write Parquet files')
+    analyze_parser.add_argument('--tickers', nargs='+', default=None, help='tickers, comma or space separated (default: NSE 500)')
+    analyze_parser.add_argument('--parts', nargs='+', default=list(PARTS), choices=PARTS)
+    analyze_parser.add_argument('--amount', type=float, default=100000)
+    analyze_parser.add_argument('--end-date', default=None, help='last day of the simulated year (default: today)')
+    analyze_parser.add_argument('--as-of', default=None, help='ignore prices after this date')
+    analyze_parser.add_argument('--no-cache', action='store_true')
+    analyze_parser.add_argument('--output', default='results')
+    analyze_parser.set_defaults(run=run_analyze)
+
+    precompute_parser = commands.add_parser('precompute', help='store the default views for the apps to load at startup')
+    precompute_parser.add_argument('--tickers', nargs='+', default=None)
+    precompute_parser.add_argument('--fetch', choices=['yfinance', 'local'], default=None,
+                                   help='download new prices first (default: only ingest tickers_data snapshots)')
+    precompute_parser.add_argument('--as-of', nargs='+', default=None,
+                                   help='as-of dates the apps load prices for, stored in addition to the latest view')
+    precompute_parser.add_argument('--amount', type=float, default=100000)
+    precompute_parser.add_argument('--daily-at', default=None, help='keep running and precompute every day at HH:MM')
+    precompute_parser.add_argument('--keep', type=int, default=4, help='result sets to keep')
+    precompute_parser.add_argument('--output', default=results_dir)
+    precompute_parser.set_defaults(run=run_precompute)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    args.run(args)
@@ -0,0 +1,136 @@
+# Lazy dataflow over one close panel. The intermediates the strategies share (the
+# forward-filled panel, rebalance schedules, prices at period boundaries, period returns,
+# rolling windows, weekly closes and the metrics and weekly stats at rebalance dates) are
+# named nodes. A Graph computes a node the first time it is asked for, with its inputs
+# pulled from other nodes, and memoizes it for the run. Running several strategies on one
+# Graph computes each intermediate at most once.
+
+import numpy as np
+import pandas as pd
+
+from momentum.cache import cached_columns, column_digests
+from momentum.memory import column_chunks
+from momentum.metrics import ROLLING_ARRAYS, RollingWindows, rolling_metrics
+from momentum.periods import asof_prices, period_label, rebalance_schedule
+from momentum.periods import period_returns as returns_between
+from momentum.profiling import count, stage
+from momentum.weekly import WEEKLY_COLUMNS, WEEKLY_ARRAYS, WeeklyStats, weekly_stats
+
+# name -> function(graph, **params)
+NODES = {}
+
+
+def node(function):
+    NODES[function.__name__] = function
+    return function
+
+
+# Node parameters as a hashable key
+def frozen(value):
+    if isinstance(value, (list, tuple, pd.Index, np.ndarray)):
+        return tuple(frozen(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, frozen(item)) for key, item in value.items()))
+    return value
+
+
+class Graph:
+    def __init__(self, close, cache=None):
+        self.close = close
+        self.cache = cache
+        self.values = {}
+
+    def get(self, name, **params):
+        if name not in NODES:
+            raise ValueError(f'Unknown node: {name}')
+        key = (name, frozen(params))
+        if key in self.values:
+            count('dag.hits')
+            return self.values[key]
+        count('dag.computed')
+        with stage(f'dag.{name}'):
+            value = NODES[name](self, **params)
+        self.values[key] = value
+        return value
+
+    # Price digests of the panel's tickers for cache keys, hashed once per Graph; None without a cache
+    def digests(self):
+        return None if self.cache is None else self.get('price_digests')
+
+    # Per-ticker cached node values (ResultCache.columns): built from the shared nodes when
+    # every ticker has to be computed, otherwise compute(close) on just the missing tickers
+    def columns(self, name, params, shared, compute):
+        return cached_columns(self.cache, name, params, self.close,
+                              lambda close: shared() if close.shape[1] == self.close.shape[1] else compute(close),
+                              digests=self.digests())
+
+
+@node
+def price_digests(graph):
+    return column_digests(graph.close)
+
+
+@node
+def filled(graph):
+    return graph.close.ffill().to_numpy(dtype='float64')
+
+
+# Rebalance periods of the simulated range: starts, ends and the result table labels
+@node
+def schedule(graph, freq, start_date, end_date):
+    starts, ends = rebalance_schedule(freq, start_date, end_date)
+    return starts, ends, [period_label(start, freq) for start in starts]
+
+
+# Last price on or before each period start ('start') or end ('end'), shape (periods, tickers)
+@node
+def boundary_prices(graph, freq, start_date, end_date, side):
+    starts, ends, _ = graph.get('schedule', freq=freq, start_date=start_date, end_date=end_date)
+    return asof_prices(graph.close, starts if side == 'start' else ends, graph.get('filled'))
+
+
+@node
+def period_returns(graph, freq, start_date, end_date):
+    starts, ends, _ = graph.get('schedule', freq=freq, start_date=start_date, end_date=end_date)
+
+    def shared():
+        start_prices = graph.get('boundary_prices', freq=freq, start_date=start_date, end_date=end_date, side='start')
+        end_prices = graph.get('boundary_prices', freq=freq, start_date=start_date, end_date=end_date, side='end')
+        return (end_prices - start_prices) / start_prices * 100
+
+    return graph.columns('period_returns', {'starts': list(starts), 'ends': list(ends)}, shared,
+                         lambda close: returns_between(close, starts, ends))
+
+
+# None when the panel does not fit the memory budget whole; rolling_metrics then works in column chunks
+@node
+def rolling_windows(graph):
+    if len(column_chunks(*graph.close.shape, ROLLING_ARRAYS)) > 1:
+        return None
+    return RollingWindows(graph.close)
+
+
+# rolling_metrics at the given dates, shape (dates, tickers, metric)
+@node
+def metrics_at(graph, dates):
+    def shared():
+        windows = graph.get('rolling_windows')
+        return rolling_metrics(graph.close, dates) if windows is None else windows.metrics(dates)
+    return graph.columns('rolling_metrics', {'dates': list(dates)}, shared, lambda close: rolling_metrics(close, dates))
+
+
+@node
+def weekly_closes(graph):
+    return graph.close.resample('W').last()
+
+
+# weekly_stats at the given (ascending) cutoffs, shape (cutoffs, tickers, 3)
+@node
+def weekly_stats_at(graph, cutoffs):
+    def shared():
+        if len(column_chunks(*graph.close.shape, WEEKLY_ARRAYS)) > 1:
+            return weekly_stats(graph.close, cutoffs)
+        stats = WeeklyStats(graph.close, graph.get('weekly_closes'), graph.get('filled'))
+        return np.array([np.column_stack(stats.advance(cutoff)) for cutoff in cutoffs]).reshape(
+            len(cutoffs), graph.close.shape[1], len(WEEKLY_COLUMNS))
+    return graph.columns('weekly_stats', {'cutoffs': list(cutoffs)}, shared, lambda close: weekly_stats(close, cutoffs))
@@ -0,0 +1,209 @@
+# Concurrent price download behind a provider interface.
+# Tickers are requested in batches on a bounded thread pool, each provider host is rate
+# limited, failed tickers are retried with exponential backoff, and every ticker that
+# still fails ends up in a FetchReport instead of a silent errored list.
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from constants.config import nse, tickers_data_dir
+from momentum.ingest import ensure_panel, ingest_frames
+from momentum.store import list_snapshots, read_snapshot
+
+
+# Provider interface: fetch a batch of tickers and return {ticker: OHLCV frame};
+# tickers left out of the result count as failed for that attempt
+class PriceProvider:
+    host = 'local'
+
+    def fetch(self, tickers, period='2y'):
+        raise NotImplementedError
+
+
+# Yahoo Finance through yfinance, one multi-ticker request per batch
+class YFinanceProvider(PriceProvider):
+    host = 'query1.finance.yahoo.com'
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def fetch(self, tickers, period='2y'):
+        import yfinance as yf
+
+        # ignore_tz=False keeps the exchange timezone, so bars can be moved to naive UTC like the
+        # snapshots (IST midnight is 18:30 the day before) and line up with the stored histories
+        data = yf.download(list(tickers), period=period, group_by='ticker', actions=True, auto_adjust=True,
+                           threads=False, progress=False, timeout=self.timeout, multi_level_index=True,
+                           ignore_tz=False)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        for ticker in tickers:
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].dropna(how='all')
+            if frame.empty:
+                continue
+            frame.index = frame.index.tz_convert(None).astype('datetime64[ns]')
+            frame.index.name = 'Date'
+            frames[ticker] = frame
+        return frames
+
+
+# Offline stand-in that serves the tickers_data snapshot CSVs, with optional latency
+# per request and injected failures so the fetch path can be tested and benchmarked
+class LocalProvider(PriceProvider):
+    host = 'local'
+
+    def __init__(self, data_dir=tickers_data_dir, as_of=None, latency=0.0, failing=()):
+        self.snapshots = list_snapshots(data_dir)
+        self.as_of = as_of
+        self.latency = latency
+        self.failing = set(failing)
+
+    def fetch(self, tickers, period='2y'):
+        if self.latency:
+            time.sleep(self.latency)
+        frames = {}
+        for ticker in tickers:
+            dates = sorted(d for d in self.snapshots.get(ticker, {}) if self.as_of is None or d <= str(self.as_of))
+            if dates and ticker not in self.failing:
+                frames[ticker] = read_snapshot(self.snapshots[ticker][dates[-1]])
+        return frames
+
+
+# Token bucket shared by every worker talking to the same host
+class RateLimiter:
+    def __init__(self, requests_per_second):
+        self.requests_per_second = requests_per_second
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+# One limiter per host, so concurrent fetch runs against the same host share the budget
+def limiter_for(host, requests_per_second):
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None or limiter.requests_per_second != requests_per_second:
+            limiter = _limiters[host] = RateLimiter(requests_per_second)
+        return limiter
+
+
+# Outcome of a fetch run: per-ticker failures with the last error and attempt count
+class FetchReport:
+    def __init__(self, tickers):
+        self.requested = list(tickers)
+        self.succeeded = []
+        self.failures = {}
+        self.requests = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    def add_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def add_successes(self, tickers):
+        with self.lock:
+            self.succeeded.extend(tickers)
+
+    def add_failures(self, tickers, attempts, error):
+        with self.lock:
+            for ticker in tickers:
+                self.failures[ticker] = {'Ticker': ticker, 'Attempts': attempts, 'Error': error}
+
+    def failures_frame(self):
+        return pd.DataFrame(list(self.failures.values()), columns=['Ticker', 'Attempts', 'Error'])
+
+    def summary(self):
+        return {
+            'requested': len(self.requested),
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failures),
+            'requests': self.requests,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+
+# Fetch every ticker in batches on a thread pool; returns ({ticker: frame}, FetchReport)
+def fetch_all(provider, tickers, period='2y', batch_size=50, max_workers=4, requests_per_second=2.0,
+              retries=3, backoff=1.0):
+    tickers = list(dict.fromkeys(tickers))
+    report = FetchReport(tickers)
+    limiter = limiter_for(provider.host, requests_per_second)
+    frames = {}
+    frames_lock = threading.Lock()
+
+    def fetch_batch(batch):
+        pending, error = list(batch), None
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1) * (1 + random.random()))
+            limiter.wait()
+            report.add_request()
+            try:
+                fetched = provider.fetch(pending, period)
+                error = 'no data returned'
+            except Exception as e:
+                fetched, error = {}, f'{type(e).__name__}: {e}'
+            succeeded = [t for t in pending if t in fetched]
+            with frames_lock:
+                frames.update({t: fetched[t] for t in succeeded})
+            report.add_successes(succeeded)
+            pending = [t for t in pending if t not in fetched]
+            if not pending:
+                return
+        report.add_failures(pending, retries + 1, error)
+
+    start = time.monotonic()
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    with ThreadPoolExecutor(max_workers) as pool:
+        list(pool.map(fetch_batch, batches))
+    report.elapsed = time.monotonic() - start
+    return frames, report
+
+
+# Download the universe, merge the bars into the canonical histories and refresh the panel
+def refresh(provider, tickers, **fetch_options):
+    frames, report = fetch_all(provider, tickers, **fetch_options)
+    changed = ingest_frames(frames)
+    ensure_panel()
+    return changed, report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download prices for the universe and merge them into the histories')
+    parser.add_argument('--provider', default='yfinance', choices=['yfinance', 'local'])
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests-per-second', type=float, default=2.0)
+    parser.add_argument('--retries', type=int, default=3)
+    args = parser.parse_args()
+
+    provider = YFinanceProvider() if args.provider == 'yfinance' else LocalProvider()
+    changed, report = refresh(provider, nse, period=args.period, batch_size=args.batch_size,
+                              max_workers=args.workers, requests_per_second=args.requests_per_second,
+                              retries=args.retries)
+    print(report.summary())
+    print(f'{len(changed)} tickers changed')
+    if report.failures:
+        print(report.failures_frame().to_string(index=False))
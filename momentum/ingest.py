@@ -0,0 +1,138 @@
+# Delta ingestion into one canonical history per ticker.
+# New bars are merged into the ticker's history (a re-sent bar overwrites the stored one),
+# histories are only rewritten when their contents change, and the manifest version moves
+# on when any did, so the panel is only rebuilt then. Downstream results need no change
+# tracking: the result cache is keyed on each ticker's prices, so only changed tickers are
+# recomputed.
+
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from constants.config import history_dir, panel_dir, tickers_data_dir
+from momentum.profiling import profiled
+from momentum.store import field_path, list_snapshots, read_snapshot, replacing, write_panel
+
+MANIFEST = 'manifest.json'
+
+
+def history_path(ticker, path=history_dir):
+    return os.path.join(path, f'{ticker}.parquet')
+
+
+def read_manifest(path=history_dir):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {'tickers': {}, 'snapshots': [], 'version': 0}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path=history_dir):
+    os.makedirs(path, exist_ok=True)
+    with replacing(os.path.join(path, MANIFEST)) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+# Content digest of a history, stable across processes
+def frame_digest(frame):
+    return hashlib.sha1(pd.util.hash_pandas_object(frame, index=True).values.tobytes()).hexdigest()
+
+
+def read_history(ticker, path=history_dir):
+    file_path = history_path(ticker, path)
+    if not os.path.exists(file_path):
+        return pd.DataFrame()
+    return pd.read_parquet(file_path)
+
+
+def read_histories(tickers=None, path=history_dir):
+    manifest = read_manifest(path)
+    tickers = sorted(manifest['tickers']) if tickers is None else tickers
+    return {ticker: read_history(ticker, path) for ticker in tickers if ticker in manifest['tickers']}
+
+
+# Merge {ticker: new bars} into the histories; returns the tickers whose history changed
+@profiled
+def ingest_frames(frames, path=history_dir):
+    manifest = read_manifest(path)
+    os.makedirs(path, exist_ok=True)
+    changed = []
+    for ticker, bars in frames.items():
+        if bars is None or bars.empty:
+            continue
+        history = read_history(ticker, path)
+        merged = pd.concat([history, bars]) if not history.empty else bars
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        merged.index.name = 'Date'
+
+        digest = frame_digest(merged)
+        if manifest['tickers'].get(ticker, {}).get('digest') == digest:
+            continue
+        with replacing(history_path(ticker, path)) as tmp_path:
+            merged.to_parquet(tmp_path)
+        manifest['tickers'][ticker] = {
+            'digest': digest,
+            'rows': len(merged),
+            'first': str(merged.index[0]),
+            'last': str(merged.index[-1]),
+        }
+        changed.append(ticker)
+
+    # Dirty flags kept by earlier versions
+    manifest.pop('dirty', None)
+    if changed:
+        manifest['version'] += 1
+    write_manifest(manifest, path)
+    return changed
+
+
+# Ingest snapshot CSVs not seen before, oldest first so later revisions win
+def ingest_snapshots(data_dir=tickers_data_dir, path=history_dir):
+    seen = set(read_manifest(path)['snapshots'])
+    pending = {}
+    for ticker, dated in list_snapshots(data_dir).items():
+        for date in sorted(dated):
+            if os.path.basename(dated[date]) not in seen:
+                pending.setdefault(date, {})[ticker] = dated[date]
+
+    changed = set()
+    for date in sorted(pending):
+        frames = {ticker: read_snapshot(file_path) for ticker, file_path in pending[date].items()}
+        changed.update(ingest_frames(frames, path))
+        manifest = read_manifest(path)
+        manifest['snapshots'] = sorted(set(manifest['snapshots']) | {os.path.basename(f) for f in pending[date].values()})
+        write_manifest(manifest, path)
+    return sorted(changed)
+
+
+# Bring histories up to date with the snapshot folder and rebuild the panel when the
+# histories have changed since it was last built
+@profiled
+def ensure_panel(path=panel_dir, data_dir=tickers_data_dir, histories=history_dir):
+    changed = ingest_snapshots(data_dir, histories)
+    version = read_manifest(histories)['version']
+    version_path = os.path.join(path, 'version.json')
+    built_version = None
+    if os.path.exists(version_path) and os.path.exists(field_path('Close', path)):
+        with open(version_path) as f:
+            built_version = json.load(f)['version']
+    if built_version != version:
+        write_panel(read_histories(path=histories), path)
+        with open(version_path, 'w') as f:
+            json.dump({'version': version}, f)
+    return changed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge new tickers_data snapshots into the canonical histories and rebuild the panel')
+    parser.add_argument('--data-dir', default=tickers_data_dir)
+    parser.add_argument('--history-dir', default=history_dir)
+    parser.add_argument('--panel-dir', default=panel_dir)
+    args = parser.parse_args()
+    changed = ensure_panel(args.panel_dir, args.data_dir, args.history_dir)
+    print(f'{len(changed)} tickers changed')
@@ -0,0 +1,199 @@
+# Background analysis runs for the Streamlit apps. A run executes on a worker thread shared
+# by every session of the app process and publishes its results as they are produced: each
+# finished table, and each rebalance period of the simulators. Runs are keyed by their
+# inputs, so sessions asking for the same universe and parameters follow one in-flight run,
+# and a run that no session follows any more (its inputs were edited) is cancelled at its
+# next progress update.
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from constants.config import job_workers, jobs_kept
+from momentum.profiling import count
+
+logger = logging.getLogger(__name__)
+
+# Rows of a finished table shown while the rest of the run is in progress
+PREVIEW_ROWS = 50
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# One background run: the tables and rebalance periods it has produced so far, the sessions
+# following it, and a cancellation flag checked at every progress update
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.frames = {}
+        self.periods = {}
+        self.version = 0
+        self.subscribers = set()
+        self.cancelled = threading.Event()
+        self.future = None
+        self.created = time.time()
+        self.lock = threading.Lock()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(self.key)
+
+    # Progress callbacks for analyze(): a finished table, and a finished rebalance period of a part
+    def frame(self, name, frame):
+        self.check()
+        with self.lock:
+            self.frames[name] = frame
+            self.version += 1
+
+    def period(self, part, label, period_return, top):
+        self.check()
+        with self.lock:
+            self.periods.setdefault(part, []).append((label, period_return, top))
+            self.version += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'version': self.version, 'frames': dict(self.frames),
+                    'periods': {part: list(rows) for part, rows in self.periods.items()}, 'done': self.done()}
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    # Cancelled or raised
+    def failed(self):
+        return self.done() and (self.future.cancelled() or self.future.exception() is not None)
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class JobManager:
+    def __init__(self, workers=job_workers, keep=jobs_kept):
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='momentum-job')
+        self.keep = keep
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    # The job for key with subscriber added to its followers. Unless an identical run is in
+    # flight or finished, starts function(*args, progress=job, **kwargs) on the pool.
+    def submit(self, key, subscriber, function, *args, **kwargs):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None or job.failed():
+                job = Job(key)
+                # In the submitting context, so the session's active Profiler records the run
+                job.future = self.pool.submit(contextvars.copy_context().run, self._run, job, function, args, kwargs)
+                self.jobs[key] = job
+                count('jobs.started')
+            else:
+                count('jobs.shared')
+            job.subscribers.add(subscriber)
+            self._evict()
+        return job
+
+    @staticmethod
+    def _run(job, function, args, kwargs):
+        try:
+            return function(*args, progress=job, **kwargs)
+        except JobCancelled:
+            logger.info('cancelled background run %s', job.key)
+            raise
+
+    # Stop following a job; a run nobody follows any more is cancelled
+    def release(self, key, subscriber):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None:
+                return
+            job.subscribers.discard(subscriber)
+            if not job.subscribers and not job.done():
+                job.cancel()
+                del self.jobs[key]
+                count('jobs.cancelled')
+
+    # Keep the `keep` most recent finished runs for sessions that come back to them
+    def _evict(self):
+        finished = sorted((job for job in self.jobs.values() if job.done()), key=lambda job: job.created)
+        for job in finished[:max(len(finished) - self.keep, 0)]:
+            del self.jobs[job.key]
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+# The manager of this process, shared by every session of the app
+def shared_jobs():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = JobManager()
+        return _shared
+
+
+# The session's job for key. A session that moves on to new inputs releases the run it was
+# following under `slot`, which is cancelled unless another session still follows it.
+def session_job(session, slot, key, function, *args, manager=None, **kwargs):
+    manager = shared_jobs() if manager is None else manager
+    subscriber = session.setdefault('job_subscriber', uuid.uuid4().hex)
+    previous = session.get(slot)
+    if previous is not None and previous != key:
+        manager.release(previous, subscriber)
+    session[slot] = key
+    return manager.submit(key, subscriber, function, *args, **kwargs)
+
+
+# Wait for the job, calling render(snapshot) every `interval` seconds; returns its result
+def follow(job, render, interval=0.25):
+    while True:
+        snapshot = job.snapshot()
+        render(snapshot)
+        if snapshot['done']:
+            return job.result()
+        time.sleep(interval)
+
+
+# Live view of a running job in the app: a status line refreshed on every tick (each
+# Streamlit call is also where a rerun from edited inputs interrupts the script), the
+# finished tables and the rebalance periods so far. totals gives the periods of each part.
+class ProgressView:
+    def __init__(self, totals=None):
+        import streamlit as st
+
+        self.totals = totals or {}
+        self.status = st.empty()
+        self.body = st.empty()
+        self.version = None
+        self.started = time.time()
+
+    def __call__(self, snapshot):
+        import pandas as pd
+        import streamlit as st
+
+        self.status.caption(f'Running in the background for {time.time() - self.started:.0f} s')
+        if snapshot['version'] == self.version:
+            return
+        self.version = snapshot['version']
+        with self.body.container():
+            for name, frame in snapshot['frames'].items():
+                if name.endswith('metrics'):
+                    st.write('### Overall Stock Returns and Metrics')
+                    st.dataframe(frame.head(PREVIEW_ROWS))
+            for part, rows in snapshot['periods'].items():
+                total = max(self.totals.get(part, len(rows)), len(rows), 1)
+                st.progress(len(rows) / total, text=f'{part}: {len(rows)} of {total} periods')
+                st.dataframe(pd.DataFrame([row[:2] for row in rows], columns=['Period', 'Return (%)']).set_index('Period'))
+
+    def clear(self):
+        self.status.empty()
+        self.body.empty()
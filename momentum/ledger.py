@@ -0,0 +1,164 @@
+# Array-backed portfolio ledger for the top-N rebalancing strategies.
+# Positions are a (periods x tickers) share matrix and every trade is a row of a columnar
+# blotter. Each period, names that left the selection are sold at the period end price
+# and new names are bought with amount / N each at the period start price; sale proceeds
+# stay in cash. Portfolio value is cash plus holdings at market, counted once, and the
+# daily equity curve is one matrix product of each period's prices with its share vector.
+
+import numpy as np
+import pandas as pd
+
+BLOTTER_COLUMNS = ['Period', 'Ticker', 'Side', 'Shares', 'Price', 'Value', 'Costs']
+
+
+# Proportional trading costs: brokerage and STT on traded value, slippage on the price
+class TransactionCosts:
+    def __init__(self, brokerage=0.0, stt=0.0, slippage=0.0):
+        self.brokerage = brokerage
+        self.stt = stt
+        self.slippage = slippage
+
+    # Buys fill above and sells below the quoted price
+    def execution_price(self, price, side):
+        return price * (1 + self.slippage) if side == 'buy' else price * (1 - self.slippage)
+
+    def fees(self, value):
+        return value * (self.brokerage + self.stt)
+
+
+NO_COSTS = TransactionCosts()
+
+
+# Positions, cash and trades carried from one period to the next
+class PortfolioLedger:
+    def __init__(self, n_tickers, amount, costs=NO_COSTS):
+        self.amount = amount
+        self.costs = costs
+        self.held = np.zeros(n_tickers)
+        self.cash = 0.0
+        self.invested = 0.0
+        self.blotter = {column: [] for column in BLOTTER_COLUMNS}
+
+    def record(self, period, positions, side, traded, price, traded_value, fees):
+        self.blotter['Period'].append(np.full(positions.size, period))
+        self.blotter['Ticker'].append(positions)
+        self.blotter['Side'].append(np.full(positions.size, side))
+        self.blotter['Shares'].append(traded)
+        self.blotter['Price'].append(price)
+        self.blotter['Value'].append(traded_value)
+        self.blotter['Costs'].append(fees)
+
+    # Trade one period towards the in_top mask; returns the shares held during the period.
+    # Names that dropped out are held through it and sold at its end; names without a
+    # start price cannot be bought.
+    def rebalance(self, period, in_top, start_prices, end_prices):
+        n_top = np.count_nonzero(in_top)
+        sold = np.flatnonzero((self.held > 0) & ~in_top)
+        sell_price = self.costs.execution_price(end_prices[sold], 'sell')
+        proceeds = self.held[sold] * sell_price
+        sell_fees = self.costs.fees(proceeds)
+        self.record(period, sold, 'sell', self.held[sold], sell_price, proceeds, sell_fees)
+
+        bought = np.flatnonzero(in_top & (self.held == 0) & ~np.isnan(start_prices))
+        buy_price = self.costs.execution_price(start_prices[bought], 'buy')
+        spend = np.full(bought.size, self.amount / n_top if n_top else 0.0)
+        buy_fees = self.costs.fees(spend)
+        bought_shares = (spend - buy_fees) / buy_price
+        self.record(period, bought, 'buy', bought_shares, buy_price, spend - buy_fees, buy_fees)
+
+        self.held[bought] = bought_shares
+        holding = self.held.copy()
+        self.held[sold] = 0
+        self.cash += np.sum(proceeds - sell_fees)
+        self.invested += np.sum(spend)
+        return holding
+
+    # Cash plus holdings at the given prices
+    def value(self, prices):
+        return self.cash + np.nansum(self.held * prices)
+
+    def blotter_arrays(self):
+        return {column: np.concatenate(parts) if parts else np.array([]) for column, parts in self.blotter.items()}
+
+
+# Run the rebalancing for a (periods x tickers) selection mask. Periods that are not
+# active (no data yet) trade nothing. Returns the share matrix held during each period,
+# cash, contributions and value after each period, and the blotter as {column: array}.
+def rebalance_ledger(selected, start_prices, end_prices, amount, costs=NO_COSTS, active=None):
+    n_periods, n_tickers = selected.shape
+    active = np.ones(n_periods, dtype=bool) if active is None else active
+    shares = np.zeros((n_periods, n_tickers))
+    cash = np.zeros(n_periods)
+    invested = np.zeros(n_periods)
+    value = np.zeros(n_periods)
+
+    ledger = PortfolioLedger(n_tickers, amount, costs)
+    for p in range(n_periods):
+        if active[p]:
+            shares[p] = ledger.rebalance(p, selected[p], start_prices[p], end_prices[p])
+        else:
+            shares[p] = ledger.held
+        cash[p] = ledger.cash
+        invested[p] = ledger.invested
+        value[p] = ledger.value(end_prices[p])
+
+    return {'shares': shares, 'cash': cash, 'invested': invested, 'value': value, 'blotter': ledger.blotter_arrays()}
+
+
+# The blotter as a table with ticker names and period labels
+def blotter_frame(ledger, tickers, labels):
+    blotter = ledger['blotter']
+    frame = pd.DataFrame(blotter, columns=BLOTTER_COLUMNS)
+    frame['Period'] = np.asarray(labels, dtype=object)[blotter['Period'].astype(int)] if len(frame) else []
+    frame['Ticker'] = np.asarray(tickers, dtype=object)[blotter['Ticker'].astype(int)] if len(frame) else []
+    return frame
+
+
+# The simulators' buying and selling price tables: Ticker, <period column>, Buying/Selling Price
+def trade_prices(ledger, tickers, labels, period_column):
+    blotter = blotter_frame(ledger, tickers, labels).rename(columns={'Period': period_column})
+    frames = []
+    for side, price_column in (('buy', 'Buying Price'), ('sell', 'Selling Price')):
+        trades = blotter[blotter['Side'] == side].rename(columns={'Price': price_column})
+        frames.append(trades[['Ticker', period_column, price_column]].reset_index(drop=True))
+    return frames
+
+
+# Daily value of the portfolio (cash + holdings at the last close) from the first period
+# start to the last period end, plus the contributions made up to each day
+def equity_curve(ledger, close, starts, ends):
+    index = close.index.values.astype('datetime64[ns]')
+    filled = np.nan_to_num(close.ffill().to_numpy(dtype='float64'))
+    first = np.searchsorted(index, pd.DatetimeIndex(starts).values.astype('datetime64[ns]'), side='left')
+    last = np.searchsorted(index, pd.DatetimeIndex(ends).values.astype('datetime64[ns]'), side='right')
+
+    dates, equity, invested = [], [], []
+    for p in range(len(first)):
+        # Days after the previous period's end belong to this period
+        begin = last[p - 1] if p else first[p]
+        previous_cash = ledger['cash'][p - 1] if p else 0.0
+        period_equity = filled[begin:last[p]] @ ledger['shares'][p] + previous_cash
+        if period_equity.size:
+            # Names sold at the period end have turned into cash, net of costs, by its last day
+            period_equity[-1] = ledger['value'][p]
+        dates.append(index[begin:last[p]])
+        equity.append(period_equity)
+        invested.append(np.full(period_equity.size, ledger['invested'][p]))
+    return pd.DataFrame({'Equity': np.concatenate(equity) if equity else [],
+                         'Invested': np.concatenate(invested) if invested else []},
+                        index=pd.DatetimeIndex(np.concatenate(dates) if dates else [], name='Date'))
+
+
+# Time-weighted growth of the equity curve: each day's change excluding that day's contributions
+def unit_value(curve):
+    flows = curve['Invested'].diff().fillna(curve['Invested'].iloc[0] if len(curve) else 0.0)
+    previous = curve['Equity'].shift()
+    growth = ((curve['Equity'] - flows) / previous).where(previous > 0, 1.0)
+    return growth.cumprod()
+
+
+def max_drawdown(curve):
+    if curve.empty:
+        return np.nan
+    units = unit_value(curve)
+    return float((units / units.cummax() - 1).min())
@@ -0,0 +1,59 @@
+# Memory ceiling for the compact data mode. A price panel is checked against the budget
+# before it is allocated: over it, it is loaded anyway with a warning, or spilled to an
+# anonymous memory-mapped file so the OS can page it out. The metric kernels split the
+# tickers into column chunks whose float64 working arrays fit in the budget.
+
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from constants.config import memory_budget, over_budget, spill_dir
+from momentum.profiling import count
+
+logger = logging.getLogger(__name__)
+
+OVER_BUDGET = ('warn', 'spill')
+
+
+def panel_nbytes(n_rows, n_tickers, dtype='float64'):
+    return n_rows * n_tickers * np.dtype(dtype).itemsize
+
+
+# Storage for a (rows x tickers) panel, one contiguous row per ticker (use .T for the
+# dates x tickers view); in memory, or spilled when it does not fit in the budget
+def panel_array(n_rows, n_tickers, dtype='float64', label='panel', budget=None, policy=None):
+    budget = memory_budget if budget is None else budget
+    policy = over_budget if policy is None else policy
+    if policy not in OVER_BUDGET:
+        raise ValueError(f'Unknown over-budget policy: {policy}')
+    needed = panel_nbytes(n_rows, n_tickers, dtype)
+    if not budget or needed <= budget:
+        return np.empty((n_tickers, n_rows), dtype=dtype)
+
+    if policy == 'warn':
+        logger.warning('%s needs %.1f MB, over the %.1f MB memory budget', label, needed / 2 ** 20, budget / 2 ** 20)
+        count('memory.over_budget')
+        return np.empty((n_tickers, n_rows), dtype=dtype)
+
+    logger.info('%s needs %.1f MB, over the %.1f MB memory budget; spilling to %s', label, needed / 2 ** 20,
+                budget / 2 ** 20, spill_dir)
+    count('memory.spills')
+    os.makedirs(spill_dir, exist_ok=True)
+    # The mapping outlives the file handle, and the file is gone once the array is
+    with tempfile.TemporaryFile(dir=spill_dir) as f:
+        return np.memmap(f, dtype=dtype, mode='w+', shape=(n_tickers, n_rows))
+
+
+# Column slices of a (rows x tickers) panel such that `arrays` float64 working copies of
+# each slice fit in the budget; one slice for everything when there is no budget
+def column_chunks(n_rows, n_tickers, arrays, budget=None):
+    budget = memory_budget if budget is None else budget
+    if not budget or not n_rows:
+        return [slice(0, n_tickers)]
+    width = max(1, int(budget // (n_rows * arrays * 8)))
+    chunks = [slice(start, start + width) for start in range(0, n_tickers, width)] or [slice(0, n_tickers)]
+    if len(chunks) > 1:
+        count('memory.column_chunks', len(chunks))
+    return chunks
@@ -0,0 +1,155 @@
+# Momentum metrics (1y/6m/3m returns, annualised std dev, Return to Risk Ratio)
+# for every ticker at every rebalance date, computed on an aligned close panel.
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from momentum.memory import column_chunks
+from momentum.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+METRIC_COLUMNS = [
+    'Last Year Return (%)',
+    'Last 6 Months Return (%)',
+    'Last 3 Months Return (%)',
+    'Average Return (%)',
+    '1 Year Std Dev (%)',
+    'Return to Risk Ratio',
+]
+LOOKBACKS = [pd.DateOffset(years=1), pd.DateOffset(months=6), pd.DateOffset(months=3)]
+WINDOW = 252
+TRADING_DAYS = 252
+# Full-size float64 working arrays rolling_metrics allocates, for sizing column chunks
+ROLLING_ARRAYS = 10
+
+
+# Calculate Returns and Metrics for a single ticker (reference for rolling_metrics)
+@profiled
+def calculate_returns(data, ticker):
+    try:
+        end_date = data.index[-1]
+        start_date_1y = end_date - pd.DateOffset(years=1)
+        start_date_6m = end_date - pd.DateOffset(months=6)
+        start_date_3m = end_date - pd.DateOffset(months=3)
+
+        last_year_data = data.loc[start_date_1y:end_date]
+        last_six_months_data = data.loc[start_date_6m:end_date]
+        last_three_months_data = data.loc[start_date_3m:end_date]
+
+        last_year_return = (last_year_data['Close'].iloc[-1] - last_year_data['Close'].iloc[0]) / \
+                           last_year_data['Close'].iloc[0] * 100
+        last_six_months_return = (last_six_months_data['Close'].iloc[-1] - last_six_months_data['Close'].iloc[0]) / \
+                                 last_six_months_data['Close'].iloc[0] * 100
+        last_three_months_return = (last_three_months_data['Close'].iloc[-1] - last_three_months_data['Close'].iloc[
+            0]) / last_three_months_data['Close'].iloc[0] * 100
+        avg_return = (last_year_return + last_six_months_return + last_three_months_return) / 3
+        std_dev = last_year_data['Close'].pct_change().std() * np.sqrt(TRADING_DAYS) * 100
+        ratio = avg_return / std_dev if std_dev != 0 else np.nan
+
+        return {
+            'Ticker': ticker,
+            'Last Year Return (%)': last_year_return,
+            'Last 6 Months Return (%)': last_six_months_return,
+            'Last 3 Months Return (%)': last_three_months_return,
+            'Average Return (%)': avg_return,
+            '1 Year Std Dev (%)': std_dev,
+            'Return to Risk Ratio': ratio
+        }
+    except Exception as e:
+        logger.error(f"Error calculating returns for {ticker}: {e}")
+        return None
+
+
+# Metrics for every ticker at every rebalance date, shape (dates, tickers, metric).
+# At each date a ticker uses its last `window` prices on or before that date, exactly
+# like calculate_returns(data.loc[:date][-window:]); one return per lookback, then the
+# average return, the std dev over the first (longest) lookback and their ratio.
+# Tickers with no price on or before a date are NaN there.
+# Under a memory budget the tickers are processed in column chunks.
+@profiled
+def rolling_metrics(close, rebalance_dates, window=WINDOW, lookbacks=LOOKBACKS):
+    return np.concatenate([_rolling_metrics(close.iloc[:, chunk], rebalance_dates, window, lookbacks)
+                           for chunk in column_chunks(*close.shape, ROLLING_ARRAYS)], axis=1)
+
+
+def _rolling_metrics(close, rebalance_dates, window, lookbacks):
+    return RollingWindows(close).metrics(rebalance_dates, window, lookbacks)
+
+
+# The per-panel part of rolling_metrics: every ticker's prices moved to the top of its
+# column and prefix sums of its daily returns. Built once, it answers metrics at any
+# rebalance dates, window and lookbacks.
+class RollingWindows:
+    def __init__(self, close):
+        values = close.to_numpy(dtype='float64')
+        self.dates = close.index.values.astype('datetime64[ns]')
+        n_rows, n_tickers = values.shape
+        self.columns = np.arange(n_tickers)[None, :]
+
+        # Each ticker's prices moved to the top of its column, so position i is its i-th price
+        valid = ~np.isnan(values)
+        self.compact = np.take_along_axis(values, np.argsort(~valid, axis=0, kind='stable'), axis=0)
+        # seen[t] = number of prices a ticker has in rows before t
+        self.seen = np.vstack([np.zeros((1, n_tickers), dtype=np.int64), np.cumsum(valid, axis=0)])
+        self.last_row = np.maximum.accumulate(np.where(valid, np.arange(n_rows)[:, None], -1), axis=0)
+
+        # Prefix sums of daily returns (and squares) in compacted order for the std dev
+        daily = np.zeros_like(self.compact)
+        daily[1:] = self.compact[1:] / self.compact[:-1] - 1
+        daily = np.nan_to_num(daily)
+        self.sum_1 = np.vstack([np.zeros((1, n_tickers)), np.cumsum(daily, axis=0)])
+        self.sum_2 = np.vstack([np.zeros((1, n_tickers)), np.cumsum(daily * daily, axis=0)])
+
+    def metrics(self, rebalance_dates, window=WINDOW, lookbacks=LOOKBACKS):
+        dates, compact, seen, columns = self.dates, self.compact, self.seen, self.columns
+        rebalance_dates = pd.DatetimeIndex(rebalance_dates).values.astype('datetime64[ns]')
+        n_tickers = compact.shape[1]
+
+        rows = np.searchsorted(dates, rebalance_dates, side='right')
+        n_obs = seen[rows]
+        has_data = n_obs > 0
+        end = np.maximum(n_obs - 1, 0)
+        first = np.maximum(n_obs - window, 0)
+        end_dates = dates[np.maximum(self.last_row[np.maximum(rows - 1, 0)], 0)]
+        end_price = compact[end, columns]
+
+        # Window position of the first price on or after end_date - lookback
+        def start_of(lookback):
+            start_dates = (pd.DatetimeIndex(end_dates.ravel()) - lookback).values.astype('datetime64[ns]')
+            start_rows = np.searchsorted(dates, start_dates, side='left').reshape(end_dates.shape)
+            return np.maximum(first, seen[start_rows, columns])
+
+        metrics = np.full((len(rebalance_dates), n_tickers, len(lookbacks) + 3), np.nan)
+        starts = []
+        for i, lookback in enumerate(lookbacks):
+            start = start_of(lookback)
+            starts.append(start)
+            start_price = compact[start, columns]
+            metrics[:, :, i] = (end_price - start_price) / start_price * 100
+        avg_return = metrics[:, :, :len(lookbacks)].sum(axis=2) / len(lookbacks)
+
+        # Sample std dev of the daily returns after the first lookback's start price
+        start = starts[0]
+        count = end - start
+        total = self.sum_1[end + 1, columns] - self.sum_1[start + 1, columns]
+        total_sq = self.sum_2[end + 1, columns] - self.sum_2[start + 1, columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (total_sq - total * total / count) / (count - 1)
+            std_dev = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan) * np.sqrt(TRADING_DAYS) * 100
+            ratio = np.where(std_dev != 0, avg_return / std_dev, np.nan)
+
+        metrics[:, :, len(lookbacks)] = avg_return
+        metrics[:, :, len(lookbacks) + 1] = std_dev
+        metrics[:, :, len(lookbacks) + 2] = ratio
+        metrics[~has_data] = np.nan
+        return metrics
+
+
+# One rebalance date of rolling_metrics as the familiar per-ticker stats table
+def metrics_table(metrics, tickers):
+    table = pd.DataFrame(metrics, columns=METRIC_COLUMNS)
+    table.insert(0, 'Ticker', list(tickers))
+    return table[~np.isnan(metrics[:, 0])].reset_index(drop=True)
@@ -0,0 +1,50 @@
+# Period returns for every ticker and rebalance period from an aligned close panel.
+# Period boundaries become row numbers with one searchsorted on the shared date axis,
+# replacing per-ticker Series.asof calls.
+
+import numpy as np
+import pandas as pd
+
+from momentum.profiling import profiled
+
+
+# Last price on or before each date for every ticker, shape (dates, tickers); same as Series.asof.
+# `filled` is close.ffill() as an array when the caller already has it.
+def asof_prices(close, dates, filled=None):
+    filled = close.ffill().to_numpy(dtype='float64') if filled is None else filled
+    index = close.index.values.astype('datetime64[ns]')
+    rows = np.searchsorted(index, pd.DatetimeIndex(dates).values.astype('datetime64[ns]'), side='right') - 1
+    prices = filled[np.maximum(rows, 0)]
+    prices[rows < 0] = np.nan
+    return prices
+
+
+# Percent return from each start to the matching end date, shape (periods, tickers)
+@profiled
+def period_returns(close, starts, ends):
+    start_prices = asof_prices(close, starts)
+    end_prices = asof_prices(close, ends)
+    return (end_prices - start_prices) / start_prices * 100
+
+
+# Per-ticker table of period returns (tickers x period labels), the individual returns view
+def returns_table(returns, tickers, labels):
+    return pd.DataFrame(np.asarray(returns).T, index=list(tickers), columns=list(labels))
+
+
+# Rebalance periods between two dates: month starts ('MS') run to the month end,
+# Mondays ('W-MON') run six days; the last period is cut at end_date
+def rebalance_schedule(freq, start_date, end_date):
+    starts = pd.date_range(start_date, end_date, freq=freq)
+    if freq == 'MS':
+        ends = [min((start + pd.DateOffset(months=1)) - pd.DateOffset(days=1), end_date) for start in starts]
+    elif freq == 'W-MON':
+        ends = [min(start + pd.DateOffset(days=6), end_date) for start in starts]
+    else:
+        raise ValueError(f'Unsupported rebalance frequency: {freq}')
+    return starts, pd.DatetimeIndex(ends)
+
+
+# Period label used by the simulators' result tables
+def period_label(start, freq):
+    return start.strftime('%Y-%m' if freq == 'MS' else '%Y-%W')
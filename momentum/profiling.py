@@ -0,0 +1,160 @@
+# Lightweight, always-on instrumentation: per-stage wall time, call counts, cache hit/miss
+# counters and peak memory for one run of the pipeline.
+# A Profiler is activated for the current run (a Streamlit rerun, a CLI invocation);
+# instrumented functions record into whichever profiler is active and cost one context
+# variable lookup when none is. Stage times are inclusive, so nested stages overlap.
+
+import contextvars
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from constants.config import profile_log
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_active = contextvars.ContextVar('momentum_profiler', default=None)
+
+
+def active_profiler():
+    return _active.get()
+
+
+# Peak resident memory of the process so far, in MB
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class Profiler:
+    def __init__(self, name='run', trace_memory=False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self.wall_seconds = None
+        self.traced_peak_mb = None
+        self.lock = threading.Lock()
+        self._token = None
+        self._started = None
+        self._tracing = False
+
+    def start(self):
+        self._token = _active.set(self)
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        return self
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self._started
+        if self._tracing:
+            self.traced_peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            self._tracing = False
+        _active.reset(self._token)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'wall_seconds': self.wall_seconds,
+                'peak_rss_mb': peak_rss_mb(),
+                'traced_peak_mb': self.traced_peak_mb,
+                'stages': {name: dict(entry) for name, entry in sorted(self.stages.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    # One structured JSON record per run, to the log and to MOMENTUM_PROFILE_LOG when set
+    def log(self):
+        record = json.dumps(self.report())
+        logger.info(record)
+        if profile_log:
+            with open(profile_log, 'a') as f:
+                f.write(record + '\n')
+        return record
+
+
+# Time a block as a named stage of the active profiler
+@contextmanager
+def stage(name):
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add_stage(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+# Decorator recording every call of a function as a stage (named after the function)
+def profiled(function=None, name=None):
+    if function is None:
+        return functools.partial(profiled, name=name)
+    stage_name = name or function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with stage(stage_name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+# Optional sidebar panel with the run's stages, counters and memory
+def show_profile(profiler, label='Show profiling'):
+    import pandas as pd
+    import streamlit as st
+
+    if not st.sidebar.checkbox(label):
+        return
+    report = profiler.report()
+    st.sidebar.write('### Profiling')
+    if report['wall_seconds'] is not None:
+        st.sidebar.write(f"Run time: {report['wall_seconds']:.3f} s")
+    if report['peak_rss_mb'] is not None:
+        st.sidebar.write(f"Peak memory: {report['peak_rss_mb']:,.1f} MB")
+    stages = pd.DataFrame.from_dict(report['stages'], orient='index')
+    if not stages.empty:
+        st.sidebar.dataframe(stages.sort_values('seconds', ascending=False))
+    if report['counters']:
+        st.sidebar.dataframe(pd.Series(report['counters'], name='count'))
@@ -0,0 +1,126 @@
+# Rendering of large result tables and charts in the Streamlit apps with a bounded payload.
+# Tables are sorted and paged on the server, so only the visible page is sent, as Arrow, to
+# the browser's virtualized grid. Charts are reduced before they are sent: heatmaps
+# average rows ranked by their mean into a fixed number of bins, and line charts keep the
+# first, last, lowest and highest point of each of a fixed number of buckets. Plotly sends
+# the reduced arrays as binary typed arrays. Page size therefore stays flat as the universe
+# and the number of periods grow.
+
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+PAGE_SIZE = 50
+MAX_COLUMNS = 60
+HEATMAP_ROWS = 100
+HEATMAP_COLUMNS = 60
+MAX_POINTS = 1000
+UNSORTED = '(table order)'
+
+
+# Positions of the rows (or columns) shown on one page
+def page_bounds(n, page, page_size):
+    start = min((page - 1) * page_size, max(n - 1, 0))
+    return start, min(start + page_size, n)
+
+
+# One page of a table. Past page_size rows the table can be sorted by any column; past
+# max_columns columns the columns are paged too.
+def paged_table(frame, key, page_size=PAGE_SIZE, max_columns=MAX_COLUMNS):
+    n_rows, n_columns = frame.shape
+    if n_rows > page_size:
+        sort_column, order_column, page_column = st.columns([3, 1, 1])
+        sort_by = sort_column.selectbox('Sort by', [UNSORTED] + list(frame.columns), key=f'{key}_sort')
+        descending = order_column.toggle('Descending', value=True, key=f'{key}_descending')
+        if sort_by != UNSORTED:
+            frame = frame.sort_values(sort_by, ascending=not descending, kind='stable')
+        page = page_column.number_input('Page', 1, math.ceil(n_rows / page_size), key=f'{key}_page')
+    else:
+        page = 1
+    column_page = 1
+    if n_columns > max_columns:
+        column_page = st.number_input('Column page', 1, math.ceil(n_columns / max_columns), key=f'{key}_columns')
+
+    row_start, row_end = page_bounds(n_rows, page, page_size)
+    column_start, column_end = page_bounds(n_columns, column_page, max_columns)
+    st.dataframe(frame.iloc[row_start:row_end, column_start:column_end])
+    if n_rows > page_size or n_columns > max_columns:
+        st.caption(f'Rows {row_start + 1}-{row_end} of {n_rows}, columns {column_start + 1}-{column_end} of {n_columns}')
+
+
+# Average consecutive groups along an axis into at most `bins`; returns the averages and
+# each group's (first, last) positions
+def bin_means(values, bins, axis):
+    n = values.shape[axis]
+    if n <= bins:
+        return values, [(i, i) for i in range(n)]
+    groups = np.array_split(np.arange(n), bins)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = np.stack([np.nanmean(np.take(values, group, axis=axis), axis=axis) for group in groups], axis=axis)
+    return means, [(group[0], group[-1]) for group in groups]
+
+
+# Heatmap-sized copy of a (rows x columns) table of returns: rows ranked by their mean and
+# averaged in rank bins, consecutive columns averaged past max_columns
+def downsample_grid(frame, max_rows=HEATMAP_ROWS, max_columns=HEATMAP_COLUMNS):
+    values = frame.to_numpy(dtype='float64')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        row_means = np.nanmean(values, axis=1) if values.size else np.zeros(len(values))
+    # Highest mean first, rows without any value last
+    order = np.argsort(-np.nan_to_num(row_means, nan=-np.inf), kind='stable')
+    values, row_groups = bin_means(values[order], max_rows, axis=0)
+    values, column_groups = bin_means(values, max_columns, axis=1)
+    rows = frame.index[order]
+    index = [str(rows[first]) if first == last else f'#{first + 1}-{last + 1}' for first, last in row_groups]
+    columns = [str(frame.columns[first]) if first == last else f'{frame.columns[first]}-{frame.columns[last]}'
+               for first, last in column_groups]
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def heatmap(frame, title, key, max_rows=HEATMAP_ROWS, max_columns=HEATMAP_COLUMNS):
+    grid = downsample_grid(frame, max_rows, max_columns)
+    figure = go.Figure(go.Heatmap(z=grid.to_numpy(dtype='float32'), x=list(grid.columns), y=list(grid.index),
+                                  colorscale='RdYlGn', zmid=0, colorbar={'title': '%'}))
+    figure.update_layout(title=title, yaxis={'autorange': 'reversed'}, height=max(300, 12 * len(grid) + 120))
+    if len(grid) < len(frame):
+        st.caption(f'{len(frame)} rows ranked by their mean and averaged in {len(grid)} bins')
+    st.plotly_chart(figure, key=key)
+
+
+# Positions of the rows to plot: the first and last row of each bucket and the lowest and
+# highest value of every column in it, with buckets sized to keep about max_points rows
+def downsample_positions(values, max_points=MAX_POINTS):
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    values = np.nan_to_num(values.reshape(n, -1), nan=0.0)
+    edges = np.linspace(0, n, max(max_points // (2 + 2 * values.shape[1]), 1) + 1).astype(int)
+    keep = [edges[:-1], edges[1:] - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        keep.append(start + values[start:end].argmin(axis=0))
+        keep.append(start + values[start:end].argmax(axis=0))
+    return np.unique(np.concatenate([np.atleast_1d(part) for part in keep]))
+
+
+# Line chart of every column of a frame (an equity curve, growth of 1), downsampled to about max_points
+def line_chart(frame, title, key, max_points=MAX_POINTS, yaxis_title=None):
+    positions = downsample_positions(frame.to_numpy(dtype='float64'), max_points)
+    sample = frame.iloc[positions]
+    figure = go.Figure([go.Scatter(x=sample.index, y=sample[column].to_numpy(dtype='float32'), mode='lines',
+                                   name=str(column)) for column in sample.columns])
+    figure.update_layout(title=title, yaxis_title=yaxis_title, height=350)
+    st.plotly_chart(figure, key=key)
+
+
+# A simulator's {period: return (%)} as a table and the growth of 1 invested in its top 10
+def period_returns(returns, key, column='Return (%)'):
+    series = pd.Series(returns, name=column, dtype='float64').rename_axis('Period')
+    growth = (1 + series.fillna(0) / 100).cumprod().rename('Growth of 1').to_frame()
+    line_chart(growth, 'Growth of 1 invested in the top 10', f'{key}_growth')
+    paged_table(series.to_frame(), key)
@@ -0,0 +1,201 @@
+# Monte Carlo robustness of the top-N momentum selection. Every simulation perturbs the
+# backtest in three ways: a random subset of the universe, rebalance dates jittered by a
+# few trading days, and a block bootstrap of the resulting period returns. Scores and
+# prices are computed once for every candidate rebalance date; a batch of simulations is
+# then one set of NumPy operations over a (simulations x periods x tickers) array, and
+# batches can fan out over a process pool.
+
+import argparse
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from constants.config import nse
+from momentum.backtest import default_range, rebalance_scores
+from momentum.ingest import ensure_panel
+from momentum.metrics import LOOKBACKS, WINDOW
+from momentum.periods import period_label, rebalance_schedule
+from momentum.profiling import profiled
+from momentum.store import load_close
+from momentum.walkforward import HORIZONS, STRATEGIES
+
+SIMULATION_COLUMNS = ['Total Return (%)', 'CAGR (%)', 'Max Drawdown (%)', 'Hit Rate (%)', 'Mean Return (%)']
+# Cells of the (simulations x periods x tickers) score array per batch
+BATCH_CELLS = 8_000_000
+
+_candidates = None
+
+
+# Scores at every jittered period end and prices at every jittered period start and end,
+# shape (periods, 2 * jitter + 1, tickers); offset `jitter` is the unperturbed date.
+# Jitter moves a date by whole trading days of the panel.
+@profiled
+def prepare_candidates(close, signal='rolling', freq='MS', jitter=2, window=WINDOW, lookbacks=LOOKBACKS,
+                       start_date=None, end_date=None):
+    start_date, end_date = default_range(close, start_date, end_date)
+    starts, ends = rebalance_schedule(freq, start_date, end_date)
+    index = close.index.values.astype('datetime64[ns]')
+    filled = close.ffill().to_numpy(dtype='float64')
+    offsets = np.arange(-jitter, jitter + 1)
+
+    # Row of the last price on or before each date, moved by each offset
+    def candidate_rows(dates):
+        base = np.searchsorted(index, pd.DatetimeIndex(dates).values.astype('datetime64[ns]'), side='right') - 1
+        rows = base[:, None] + offsets[None, :]
+        return np.clip(rows, 0, len(index) - 1), (base[:, None] < 0) | (rows < 0)
+
+    def prices_at(rows, missing):
+        prices = filled[rows]
+        prices[missing] = np.nan
+        return prices
+
+    start_rows, start_missing = candidate_rows(starts)
+    end_rows, end_missing = candidate_rows(ends)
+    score_rows = np.unique(end_rows[~end_missing])
+    scores, available = rebalance_scores(close, signal, close.index[score_rows], window, lookbacks)
+    at = np.searchsorted(score_rows, end_rows)
+    at = np.minimum(at, max(len(score_rows) - 1, 0))
+    candidate_scores = np.where(available[at], scores[at], np.nan) if len(score_rows) else \
+        np.full(end_rows.shape + (close.shape[1],), np.nan)
+    candidate_scores[end_missing] = np.nan
+    return {
+        'tickers': list(close.columns),
+        'labels': [period_label(start, freq) for start in starts],
+        'scores': candidate_scores,
+        'start_prices': prices_at(start_rows, start_missing),
+        'end_prices': prices_at(end_rows, end_missing),
+        'periods_per_year': HORIZONS[freq],
+    }
+
+
+# Average return of each simulation's top n in each period, shape (simulations, periods).
+# universe is a (simulations x tickers) mask; offsets (simulations x periods + 1) index the
+# candidate dates of each rebalance, which ends one period and starts the next.
+def selection_returns(candidates, universe, offsets, top_n=10):
+    n_periods, _, n_tickers = candidates['scores'].shape
+    periods = np.arange(n_periods)[None, :]
+    scores = np.where(universe[:, None, :], candidates['scores'][periods, offsets[:, 1:]], np.nan)
+    ranked = ~np.isnan(scores)
+    keys = np.where(ranked, scores, -np.inf)
+    # The top n by a partition around the n-th highest score; ties there go to the first
+    # columns, as in top_n_positions
+    n = min(top_n, n_tickers)
+    cutoff = -np.partition(-keys, n - 1, axis=2)[:, :, n - 1:n] if n else np.full(keys.shape[:2] + (1,), np.inf)
+    above = ranked & (keys > cutoff)
+    tied = ranked & (keys == cutoff)
+    chosen = above | (tied & (np.cumsum(tied, axis=2) <= n - above.sum(axis=2, keepdims=True)))
+
+    start = candidates['start_prices'][periods, offsets[:, :-1]]
+    end = candidates['end_prices'][periods, offsets[:, 1:]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(chosen, (end - start) / start * 100, np.nan)
+    # Periods where a simulation ranks nothing stay NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(returns, axis=2)
+
+
+# Resample each row's periods in blocks of consecutive periods, with replacement
+def block_bootstrap(period_returns, block, rng):
+    n_simulations, n_periods = period_returns.shape
+    block = min(block, n_periods)
+    block_starts = rng.integers(0, n_periods - block + 1, size=(n_simulations, math.ceil(n_periods / block)))
+    rows = (block_starts[:, :, None] + np.arange(block)[None, None, :]).reshape(n_simulations, -1)[:, :n_periods]
+    return np.take_along_axis(period_returns, rows, axis=1)
+
+
+# Outcomes of compounding each row of period returns (periods without a selection count as flat)
+def path_outcomes(period_returns, periods_per_year):
+    observed = (~np.isnan(period_returns)).sum(axis=1)
+    path = np.cumprod(1 + np.nan_to_num(period_returns) / 100, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(path, 1), axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(observed > 0, path[:, -1] ** (periods_per_year / observed) - 1, np.nan)
+        hit_rate = np.where(observed > 0, (period_returns > 0).sum(axis=1) / observed, np.nan)
+        mean_return = np.where(observed > 0, np.nansum(period_returns, axis=1) / observed, np.nan)
+    return {
+        'Total Return (%)': (path[:, -1] - 1) * 100,
+        'CAGR (%)': cagr * 100,
+        'Max Drawdown (%)': (path / peaks - 1).min(axis=1) * 100,
+        'Hit Rate (%)': hit_rate * 100,
+        'Mean Return (%)': mean_return,
+    }
+
+
+# One batch of simulations from its own seed
+def simulate_batch(candidates, n_simulations, seed, top_n=10, universe_fraction=0.8, jitter=2, block=3):
+    rng = np.random.default_rng(seed)
+    n_periods, n_offsets, n_tickers = candidates['scores'].shape
+    size = max(1, round(universe_fraction * n_tickers)) if n_tickers else 0
+    universe = np.zeros((n_simulations, n_tickers), dtype=bool)
+    np.put_along_axis(universe, rng.random((n_simulations, n_tickers)).argsort(axis=1)[:, :size], True, axis=1)
+    offsets = rng.integers(n_offsets // 2 - jitter, n_offsets // 2 + jitter + 1, size=(n_simulations, n_periods + 1))
+
+    period_returns = selection_returns(candidates, universe, offsets, top_n)
+    if block:
+        period_returns = block_bootstrap(period_returns, block, rng)
+    return path_outcomes(period_returns, candidates['periods_per_year'])
+
+
+def _attach(candidates):
+    global _candidates
+    _candidates = candidates
+
+
+def _run(task):
+    return simulate_batch(_candidates, *task)
+
+
+# Run n_simulations perturbed backtests; returns one row of outcomes per simulation.
+# Batches draw from their own child seeds, so results do not depend on `workers`.
+@profiled
+def robustness(close, signal='rolling', freq='MS', n_simulations=10000, top_n=10, universe_fraction=0.8, jitter=2,
+               block=3, seed=0, workers=None, window=WINDOW, lookbacks=LOOKBACKS, start_date=None, end_date=None):
+    candidates = prepare_candidates(close, signal, freq, jitter, window, lookbacks, start_date, end_date)
+    n_periods, _, n_tickers = candidates['scores'].shape
+    batch_size = max(1, BATCH_CELLS // max(n_periods * n_tickers, 1))
+    sizes = [min(batch_size, n_simulations - start) for start in range(0, n_simulations, batch_size)]
+    tasks = [(size, child, top_n, universe_fraction, jitter, block)
+             for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))]
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_attach, initargs=(candidates,)) as pool:
+            batches = list(pool.map(_run, tasks))
+    else:
+        batches = [simulate_batch(candidates, *task) for task in tasks]
+    return pd.DataFrame({column: np.concatenate([batch[column] for batch in batches]) if batches else []
+                         for column in SIMULATION_COLUMNS}).rename_axis('Simulation')
+
+
+# Distribution of the simulated outcomes
+def simulation_distribution(simulations, percentiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    return simulations[SIMULATION_COLUMNS].describe(percentiles=list(percentiles)).transpose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monte Carlo robustness of the momentum top-N selection')
+    parser.add_argument('--strategy', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--simulations', type=int, default=10000)
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--universe-fraction', type=float, default=0.8, help='share of the universe each simulation draws')
+    parser.add_argument('--jitter', type=int, default=2, help='move each rebalance by up to this many trading days')
+    parser.add_argument('--block', type=int, default=3, help='bootstrap block length in periods (0: no bootstrap)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: run in this process)')
+    parser.add_argument('--start-date', default=None)
+    parser.add_argument('--end-date', default=None)
+    parser.add_argument('--output', default='robustness', help='prefix for the <output>_<strategy>.parquet files')
+    args = parser.parse_args()
+
+    ensure_panel()
+    close = load_close(nse)
+    for strategy in args.strategy:
+        signal, freq, _ = STRATEGIES[strategy]
+        simulations = robustness(close, signal, freq, args.simulations, args.top_n, args.universe_fraction, args.jitter,
+                                 args.block, args.seed, args.workers, start_date=args.start_date, end_date=args.end_date)
+        simulations.to_parquet(f'{args.output}_{strategy}.parquet')
+        print(f'{strategy}: {len(simulations)} simulations')
+        print(simulation_distribution(simulations).to_string())
@@ -0,0 +1,157 @@
+# Columnar price panel built from per-ticker price frames (CSV snapshots or canonical histories).
+# One Arrow IPC file per field (Date + one column per ticker) so a read can be
+# memory-mapped and projected down to a single field for the requested universe.
+
+import argparse
+import glob
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from constants.config import panel_dir, panel_dtype, tickers_data_dir
+from momentum.memory import panel_array
+from momentum.profiling import profiled
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+DATE_COLUMN = 'Date'
+# Rows per record batch, so scanners can walk the panel in date-ordered blocks
+BATCH_ROWS = 256
+
+snapshot_pattern = re.compile(r'^(?P<ticker>.+)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$')
+
+
+# A temporary file next to target, swapped in over it when the block completes (and removed
+# when it raises), so readers never see a half-written file. Each writer gets its own file,
+# so concurrent writers of one target (threads or processes) do not collide; the last swap wins.
+@contextmanager
+def replacing(target):
+    directory, name = os.path.split(target)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory or '.')
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def field_path(field, path=panel_dir):
+    return os.path.join(path, f'{field}.arrow')
+
+
+# Map every ticker to its snapshot files, {ticker: {date: path}}
+def list_snapshots(data_dir=tickers_data_dir):
+    snapshots = {}
+    for file_path in glob.glob(os.path.join(data_dir, '*.csv')):
+        match = snapshot_pattern.match(os.path.basename(file_path))
+        if match:
+            snapshots.setdefault(match.group('ticker'), {})[match.group('date')] = file_path
+    return snapshots
+
+
+# Read one snapshot CSV into a timezone-naive frame, as the app always has.
+# fields projects the read down to those price columns.
+@profiled
+def read_snapshot(file_path, fields=None):
+    data = pd.read_csv(file_path, index_col=0, usecols=None if fields is None else [DATE_COLUMN, *fields])
+    data.index = pd.to_datetime(data.index).tz_convert(None).astype('datetime64[ns]')
+    return data[~data.index.duplicated(keep='last')].sort_index()
+
+
+# Latest snapshot per ticker taken on or before as_of (latest overall when as_of is None)
+def read_snapshots(tickers=None, as_of=None, data_dir=tickers_data_dir, fields=None):
+    frames = {}
+    for ticker, dated in list_snapshots(data_dir).items():
+        if tickers is not None and ticker not in tickers:
+            continue
+        dates = sorted(date for date in dated if as_of is None or date <= str(as_of))
+        if dates:
+            frames[ticker] = read_snapshot(dated[dates[-1]], fields)
+    return frames
+
+
+# Write {ticker: OHLCV frame} as the panel, NaN-padded on the union of all dates
+@profiled
+def write_panel(frames, path=panel_dir, fields=FIELDS):
+    os.makedirs(path, exist_ok=True)
+    tickers = sorted(frames)
+    for field in fields:
+        wide = pd.concat({ticker: frames[ticker][field] for ticker in tickers if field in frames[ticker]}, axis=1)
+        wide = wide.reindex(columns=tickers).sort_index().astype('float64')
+        arrays = [pa.array(wide.index.values.astype('datetime64[ns]'))]
+        arrays += [pa.array(wide[ticker].values, type=pa.float64()) for ticker in tickers]
+        table = pa.Table.from_arrays(arrays, names=[DATE_COLUMN] + tickers)
+
+        with replacing(field_path(field, path)) as tmp_path:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table, max_chunksize=BATCH_ROWS)
+
+
+# Convert the CSV snapshots into the panel in one pass
+def convert_snapshots(data_dir=tickers_data_dir, path=panel_dir, as_of=None, fields=FIELDS):
+    frames = read_snapshots(as_of=as_of, data_dir=data_dir, fields=fields)
+    write_panel(frames, path, fields)
+    return sorted(frames)
+
+
+# Memory-map one field file; column buffers stay on disk until they are touched
+def open_field(field='Close', path=panel_dir):
+    source = pa.memory_map(field_path(field, path), 'r')
+    return ipc.open_file(source).read_all()
+
+
+def panel_tickers(path=panel_dir):
+    with pa.memory_map(field_path('Close', path), 'r') as source:
+        names = ipc.open_file(source).schema.names
+    return [name for name in names if name != DATE_COLUMN]
+
+
+# One bulk read of a single field for the universe, dates x tickers, on the shared date
+# index with NaN gaps. Tickers missing from the panel are left out of the columns.
+# dtype defaults to MOMENTUM_PANEL_DTYPE (float32 halves the panel); the values are
+# copied column by column into one block, spilled when it is over the memory budget.
+@profiled
+def load_field(tickers=None, field='Close', path=panel_dir, as_of=None, dtype=None, budget=None, policy=None):
+    table = open_field(field, path)
+    available = set(table.schema.names) - {DATE_COLUMN}
+    if tickers is None:
+        selected = [name for name in table.schema.names if name != DATE_COLUMN]
+    else:
+        selected = [ticker for ticker in dict.fromkeys(tickers) if ticker in available]
+
+    dates = pd.DatetimeIndex(table.column(DATE_COLUMN).to_numpy(), name=DATE_COLUMN)
+    n_rows = len(dates) if as_of is None else dates.slice_indexer(None, str(as_of)).stop
+
+    # Dates where at least one selected ticker has a price
+    has_data = np.zeros(n_rows, dtype=bool)
+    for ticker in selected:
+        has_data |= ~np.isnan(table.column(ticker).to_numpy()[:n_rows])
+
+    values = panel_array(int(has_data.sum()), len(selected), dtype or panel_dtype, f'{field} panel', budget, policy)
+    for i, ticker in enumerate(selected):
+        values[i] = table.column(ticker).to_numpy()[:n_rows][has_data]
+    return pd.DataFrame(values.T, index=dates[:n_rows][has_data], columns=selected, copy=False)
+
+
+def load_close(tickers=None, path=panel_dir, as_of=None, dtype=None, budget=None, policy=None):
+    return load_field(tickers, 'Close', path, as_of, dtype, budget, policy)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert tickers_data CSV snapshots into the columnar price panel')
+    parser.add_argument('--data-dir', default=tickers_data_dir)
+    parser.add_argument('--panel-dir', default=panel_dir)
+    parser.add_argument('--as-of', default=None, help='use the latest snapshot on or before this date')
+    parser.add_argument('--fields', nargs='+', default=FIELDS, choices=FIELDS, help='price columns to read and store')
+    args = parser.parse_args()
+    converted = convert_snapshots(args.data_dir, args.panel_dir, args.as_of, args.fields)
+    print(f'wrote {len(converted)} tickers to {args.panel_dir}')
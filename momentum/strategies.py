@@ -0,0 +1,232 @@
+# The investment simulators behind the Streamlit apps, as importable functions of the
+# close panel so they can be run and benchmarked outside Streamlit.
+# end_date defaults to today, as in the apps; the simulated range is the year up to it.
+# With a ResultCache, whole results are reused across reruns and the per-ticker inputs
+# (metrics, period returns, weekly stats) are only computed for tickers not seen before.
+# Inputs come from a dag.Graph; passing one Graph to several simulators computes each
+# shared intermediate once. on_period(label, period_return, top_10) is called as each
+# rebalance period is ranked, for callers that show progress.
+
+import numpy as np
+import pandas as pd
+
+from momentum.cache import cached_result
+from momentum.dag import Graph
+from momentum.ingest import frame_digest
+from momentum.ledger import NO_COSTS, rebalance_ledger, trade_prices
+from momentum.metrics import metrics_table
+from momentum.periods import returns_table
+from momentum.profiling import profiled, stage
+from momentum.weekly import weekly_table
+
+
+def simulation_range(end_date=None):
+    end_date = pd.Timestamp.today().normalize() if end_date is None else pd.Timestamp(end_date).normalize()
+    return end_date - pd.DateOffset(years=1), end_date
+
+
+def simulation_graph(close_panel, cache=None, graph=None):
+    return Graph(close_panel, cache) if graph is None else graph
+
+
+# Latest metrics table for every ticker in the panel; cached whole, and per ticker underneath
+@profiled
+def overview_metrics(close_panel, cache=None, graph=None):
+    graph = simulation_graph(close_panel, cache, graph)
+    dates = close_panel.index[-1:]
+    return cached_result(cache, 'overview_metrics', {'dates': list(dates)}, close_panel,
+                         lambda: metrics_table(graph.get('metrics_at', dates=dates)[0], close_panel.columns),
+                         graph.digests())
+
+
+# Latest weekly stats table for every ticker in the panel; cached whole, and per ticker underneath
+@profiled
+def overview_weekly(close_panel, cache=None, graph=None):
+    graph = simulation_graph(close_panel, cache, graph)
+    cutoffs = close_panel.index[-1:]
+    return cached_result(cache, 'overview_weekly', {'cutoffs': list(cutoffs)}, close_panel,
+                         lambda: weekly_table(graph.get('weekly_stats_at', cutoffs=cutoffs)[0], close_panel.columns),
+                         graph.digests())
+
+
+# Strategy 1: monthly SIP into the top 10 of the year-end ranking in tickers_data
+@profiled
+def simulate_investment_strategy_1(close_panel, tickers_data, amount=100000, end_date=None, cache=None, graph=None,
+                                   on_period=None):
+    start_date, end_date = simulation_range(end_date)
+    graph = simulation_graph(close_panel, cache, graph)
+    params = {'tickers_data': frame_digest(tickers_data), 'amount': amount, 'end_date': end_date}
+    return cached_result(cache, 'simulate_investment_strategy_1', params, close_panel[tickers_data['Ticker']],
+                         lambda: _strategy_1(graph, tickers_data, amount, start_date, end_date, on_period),
+                         graph.digests())
+
+
+def _strategy_1(graph, tickers_data, amount, start_date, end_date, on_period=None):
+    monthly_returns = {}
+    top_10_monthly = {}
+
+    months, _, labels = graph.get('schedule', freq='MS', start_date=start_date, end_date=end_date)
+
+    # Month Return for every ticker and month in one lookup
+    returns = graph.get('period_returns', freq='MS', start_date=start_date, end_date=end_date)
+    returns = returns[:, graph.close.columns.get_indexer(tickers_data['Ticker'])]
+    individual_monthly_returns_df = returns_table(returns, tickers_data['Ticker'], labels)
+
+    for i, month in enumerate(months):
+        tickers_data['Month Return'] = returns[i]
+
+        with stage('ranking'):
+            top_10_tickers = tickers_data.nlargest(10, 'Return to Risk Ratio')[['Ticker', 'Month Return']]
+        avg_month_return = tickers_data.loc[
+            tickers_data['Ticker'].isin(top_10_tickers['Ticker']), 'Month Return'].mean()
+
+        monthly_returns[month.strftime('%Y-%m')] = avg_month_return
+        top_10_monthly[month.strftime('%Y-%m')] = top_10_tickers.set_index('Ticker').to_dict()[
+            'Month Return']
+        if on_period is not None:
+            on_period(month.strftime('%Y-%m'), avg_month_return, top_10_monthly[month.strftime('%Y-%m')])
+
+    total_return = np.prod([1 + r / 100 for r in monthly_returns.values() if not np.isnan(r)]) - 1
+    total_amount = amount * 12 * (1 + total_return)
+
+    top_10_monthly_df = pd.DataFrame(top_10_monthly).transpose()
+
+    return total_amount, monthly_returns, individual_monthly_returns_df, top_10_monthly_df
+
+
+# Rebalance on the selections in a portfolio ledger; returns the final value and the
+# buying and selling price tables
+def ledger_trades(graph, selected, active, freq, start_date, end_date, amount, costs, period_column):
+    _, _, labels = graph.get('schedule', freq=freq, start_date=start_date, end_date=end_date)
+    ledger = rebalance_ledger(
+        selected, graph.get('boundary_prices', freq=freq, start_date=start_date, end_date=end_date, side='start'),
+        graph.get('boundary_prices', freq=freq, start_date=start_date, end_date=end_date, side='end'),
+        amount, costs, active)
+    buying_prices_df, selling_prices_df = trade_prices(ledger, graph.close.columns, labels, period_column)
+    total_amount = ledger['value'][-1] if len(ledger['value']) else 0.0
+    return total_amount, buying_prices_df, selling_prices_df
+
+
+# Strategy 2: re-rank every month and hold the top 10, tracking buying and selling prices
+@profiled
+def simulate_investment_strategy_2(close_panel, tickers_list, amount=100000, end_date=None, cache=None,
+                                   costs=NO_COSTS, graph=None, on_period=None):
+    start_date, end_date = simulation_range(end_date)
+    graph = simulation_graph(close_panel, cache, graph)
+    params = {'tickers': list(tickers_list), 'amount': amount, 'end_date': end_date, 'costs': vars(costs)}
+    return cached_result(cache, 'simulate_investment_strategy_2', params, close_panel,
+                         lambda: _strategy_2(graph, tickers_list, amount, start_date, end_date, costs, on_period),
+                         graph.digests())
+
+
+def _strategy_2(graph, tickers_list, amount, start_date, end_date, costs=NO_COSTS, on_period=None):
+    close_panel = graph.close
+    monthly_returns = {}
+    top_10_monthly = {}
+
+    months, month_ends, labels = graph.get('schedule', freq='MS', start_date=start_date, end_date=end_date)
+
+    # Metrics and Month Return for every month end at once, and each ticker's close series once
+    metrics = graph.get('metrics_at', dates=month_ends)
+    individual_monthly_returns_df = returns_table(
+        graph.get('period_returns', freq='MS', start_date=start_date, end_date=end_date), close_panel.columns, labels)
+    positions = pd.Series(np.arange(close_panel.shape[1]), index=close_panel.columns)
+    selected = np.zeros((len(months), close_panel.shape[1]), dtype=bool)
+    active = np.zeros(len(months), dtype=bool)
+    simulated_months = []
+
+    for i, month in enumerate(months):
+        tickers_data = metrics_table(metrics[i], close_panel.columns)
+        if tickers_data.empty:
+            continue
+
+        tickers_data['Month Return'] = tickers_data['Ticker'].map(individual_monthly_returns_df[month.strftime('%Y-%m')])
+        simulated_months.append(month.strftime('%Y-%m'))
+
+        with stage('ranking'):
+            top_10_tickers = tickers_data.nlargest(10, 'Return to Risk Ratio')[['Ticker', 'Month Return']]
+        avg_month_return = tickers_data.loc[
+            tickers_data['Ticker'].isin(top_10_tickers['Ticker']), 'Month Return'].mean()
+
+        monthly_returns[month.strftime('%Y-%m')] = avg_month_return
+        top_10_monthly[month.strftime('%Y-%m')] = top_10_tickers.set_index('Ticker').to_dict()[
+            'Month Return']
+        if on_period is not None:
+            on_period(month.strftime('%Y-%m'), avg_month_return, top_10_monthly[month.strftime('%Y-%m')])
+
+        selected[i, positions[top_10_tickers['Ticker']]] = True
+        active[i] = True
+
+    total_amount, buying_prices_df, selling_prices_df = ledger_trades(
+        graph, selected, active, 'MS', start_date, end_date, amount, costs, 'Month')
+
+    individual_monthly_returns_df = individual_monthly_returns_df.reindex(index=list(dict.fromkeys(tickers_list)),
+                                                                          columns=simulated_months)
+    top_10_monthly_df = pd.DataFrame(top_10_monthly).transpose()
+
+    return total_amount, monthly_returns, individual_monthly_returns_df, top_10_monthly_df, buying_prices_df, selling_prices_df
+
+
+# Weekly momentum: re-rank every week on the weekly stats and hold the top 10
+@profiled
+def simulate_investment_strategy_weekly(close_panel, tickers_list, amount=100000, end_date=None, cache=None,
+                                        costs=NO_COSTS, graph=None, on_period=None):
+    start_date, end_date = simulation_range(end_date)
+    graph = simulation_graph(close_panel, cache, graph)
+    params = {'tickers': list(tickers_list), 'amount': amount, 'end_date': end_date, 'costs': vars(costs)}
+    return cached_result(cache, 'simulate_investment_strategy_weekly', params, close_panel,
+                         lambda: _strategy_weekly(graph, tickers_list, amount, start_date, end_date, costs,
+                                                  on_period), graph.digests())
+
+
+def _strategy_weekly(graph, tickers_list, amount, start_date, end_date, costs=NO_COSTS, on_period=None):
+    close_panel = graph.close
+    weekly_investment = amount / 52
+
+    weekly_returns = {}
+    top_10_weekly = {}
+
+    weeks, week_ends, labels = graph.get('schedule', freq='W-MON', start_date=start_date, end_date=end_date)
+
+    # Week Return for every ticker and week in one lookup
+    individual_weekly_returns_df = returns_table(
+        graph.get('period_returns', freq='W-MON', start_date=start_date, end_date=end_date), close_panel.columns,
+        labels)
+    simulated_weeks = []
+
+    # Weekly stats move forward one week at a time instead of re-resampling each ticker's history
+    stats = graph.get('weekly_stats_at', cutoffs=week_ends)
+    positions = pd.Series(np.arange(close_panel.shape[1]), index=close_panel.columns)
+    selected = np.zeros((len(weeks), close_panel.shape[1]), dtype=bool)
+    active = np.zeros(len(weeks), dtype=bool)
+
+    for i, week in enumerate(weeks):
+        tickers_data = weekly_table(stats[i], close_panel.columns)
+        if tickers_data.empty:
+            continue
+
+        tickers_data['Week Return'] = tickers_data['Ticker'].map(individual_weekly_returns_df[week.strftime('%Y-%W')])
+        simulated_weeks.append(week.strftime('%Y-%W'))
+
+        with stage('ranking'):
+            top_10_tickers = tickers_data.nlargest(10, 'Return to Risk Ratio')[['Ticker', 'Week Return']]
+        avg_week_return = tickers_data.loc[
+            tickers_data['Ticker'].isin(top_10_tickers['Ticker']), 'Week Return'].mean()
+
+        weekly_returns[week.strftime('%Y-%W')] = avg_week_return
+        top_10_weekly[week.strftime('%Y-%W')] = top_10_tickers.set_index('Ticker').to_dict()[
+            'Week Return']
+        if on_period is not None:
+            on_period(week.strftime('%Y-%W'), avg_week_return, top_10_weekly[week.strftime('%Y-%W')])
+
+        selected[i, positions[top_10_tickers['Ticker']]] = True
+        active[i] = True
+
+    total_amount, buying_prices_df, selling_prices_df = ledger_trades(
+        graph, selected, active, 'W-MON', start_date, end_date, weekly_investment, costs, 'Week')
+
+    individual_weekly_returns_df = individual_weekly_returns_df.reindex(index=list(dict.fromkeys(tickers_list)),
+                                                                        columns=simulated_weeks)
+    top_10_weekly_df = pd.DataFrame(top_10_weekly).transpose()
+
+    return total_amount, weekly_returns, individual_weekly_returns_df, top_10_weekly_df, buying_prices_df, selling_prices_df
@@ -0,0 +1,287 @@
+# Out-of-core momentum backtest over long histories. The Close file of the price panel is
+# scanned in date-ordered record batches through a pyarrow dataset, and only a ring buffer
+# of each ticker's last `window` prices is kept. At every period end the Return to Risk
+# Ratio is computed from that buffer, exactly as rolling_metrics would from the full
+# history, and the period's ranking, return and trades are emitted before reading on.
+# Memory depends on window x tickers, not on how many years are scanned.
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from constants.config import nse, panel_dir
+from momentum.backtest import top_n_positions
+from momentum.ledger import BLOTTER_COLUMNS, NO_COSTS, PortfolioLedger, max_drawdown
+from momentum.metrics import LOOKBACKS, TRADING_DAYS, WINDOW
+from momentum.periods import period_label, rebalance_schedule
+from momentum.profiling import count, profiled
+from momentum.store import BATCH_ROWS, DATE_COLUMN, field_path
+
+LAST_DATE = np.iinfo(np.int64).max
+
+
+# Each ticker's last `window` prices and their dates, plus the last price seen (asof)
+class WindowState:
+    def __init__(self, n_tickers, window=WINDOW):
+        self.window = window
+        self.prices = np.full((window, n_tickers), np.nan)
+        self.dates = np.zeros((window, n_tickers), dtype=np.int64)
+        self.count = np.zeros(n_tickers, dtype=np.int64)
+        self.last_price = np.full(n_tickers, np.nan)
+
+    def push(self, date, row):
+        valid = np.flatnonzero(~np.isnan(row))
+        slot = self.count[valid] % self.window
+        self.prices[slot, valid] = row[valid]
+        self.dates[slot, valid] = date
+        self.count[valid] += 1
+        self.last_price[valid] = row[valid]
+
+    # The buffers oldest first; slots a ticker has not filled yet hold NaN / LAST_DATE
+    def ordered(self):
+        n_tickers = len(self.count)
+        offset = np.where(self.count > self.window, self.count % self.window, 0)
+        rows = (offset[None, :] + np.arange(self.window)[:, None]) % self.window
+        filled = np.arange(self.window)[:, None] < np.minimum(self.count, self.window)[None, :]
+        prices = np.where(filled, np.take_along_axis(self.prices, rows, axis=0), np.nan)
+        dates = np.where(filled, np.take_along_axis(self.dates, rows, axis=0), LAST_DATE)
+        return prices, dates, np.minimum(self.count, self.window).reshape(n_tickers)
+
+    # rolling_metrics at the current date, shape (tickers, metric)
+    def metrics(self, lookbacks=LOOKBACKS):
+        prices, dates, n_obs = self.ordered()
+        columns = np.arange(prices.shape[1])
+        end = np.maximum(n_obs - 1, 0)
+        end_price = prices[end, columns]
+        end_dates = pd.DatetimeIndex(dates[end, columns].astype('datetime64[ns]'))
+
+        metrics = np.full((prices.shape[1], len(lookbacks) + 3), np.nan)
+        starts = []
+        for i, lookback in enumerate(lookbacks):
+            start_dates = (end_dates - lookback).values.astype('datetime64[ns]').view(np.int64)
+            # First buffered price on or after end date - lookback
+            start = np.minimum((dates < start_dates[None, :]).sum(axis=0), end)
+            starts.append(start)
+            start_price = prices[start, columns]
+            metrics[:, i] = (end_price - start_price) / start_price * 100
+        avg_return = metrics[:, :len(lookbacks)].sum(axis=1) / len(lookbacks)
+
+        # Sample std dev of the daily returns after the first lookback's start price
+        daily = np.zeros_like(prices)
+        daily[1:] = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+        positions = np.arange(self.window)[:, None]
+        in_range = (positions > starts[0][None, :]) & (positions <= end[None, :])
+        count = end - starts[0]
+        total = np.where(in_range, daily, 0).sum(axis=0)
+        total_sq = np.where(in_range, daily * daily, 0).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (total_sq - total * total / count) / (count - 1)
+            std_dev = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan) * np.sqrt(TRADING_DAYS) * 100
+            ratio = np.where(std_dev != 0, avg_return / std_dev, np.nan)
+
+        metrics[:, len(lookbacks)] = avg_return
+        metrics[:, len(lookbacks) + 1] = std_dev
+        metrics[:, len(lookbacks) + 2] = ratio
+        metrics[n_obs == 0] = np.nan
+        return metrics
+
+
+def open_close_dataset(path=panel_dir):
+    return ds.dataset(field_path('Close', path), format='arrow')
+
+
+# Requested tickers that are in the store, in request order (all of them for None)
+def stream_tickers(dataset, tickers=None):
+    names = [name for name in dataset.schema.names if name != DATE_COLUMN]
+    if tickers is None:
+        return names
+    available = set(names)
+    return [ticker for ticker in dict.fromkeys(tickers) if ticker in available]
+
+
+# Default range as in backtest.default_range, reading only the date column
+def stream_range(dataset, start_date=None, end_date=None):
+    if end_date is None:
+        dates = dataset.to_table(columns=[DATE_COLUMN]).column(DATE_COLUMN)
+        end_date = pd.Timestamp(dates[len(dates) - 1].as_py()).ceil('D')
+    if start_date is None:
+        start_date = pd.Timestamp(end_date) - pd.DateOffset(years=1)
+    return pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+
+# Scan the store once and yield every rebalance period as soon as its end has been read:
+# scores and availability at the period end, start and end prices, and the period's days
+# (from the day after the previous period end) with the last known price of each ticker
+@profiled
+def stream_periods(tickers, freq='MS', start_date=None, end_date=None, window=WINDOW, lookbacks=LOOKBACKS,
+                   path=panel_dir, batch_rows=BATCH_ROWS):
+    dataset = open_close_dataset(path)
+    start_date, end_date = stream_range(dataset, start_date, end_date)
+    starts, ends = rebalance_schedule(freq, start_date, end_date)
+    start_events = starts.values.astype('datetime64[ns]').view(np.int64)
+    end_events = ends.values.astype('datetime64[ns]').view(np.int64)
+    n_periods = len(starts)
+
+    state = WindowState(len(tickers), window)
+    start_prices = [None] * n_periods
+    next_start = next_end = 0
+    days, day_prices = [], []
+
+    def period(p):
+        metrics = state.metrics(lookbacks)
+        return {
+            'period': p,
+            'label': period_label(starts[p], freq),
+            'start': starts[p],
+            'end': ends[p],
+            'scores': metrics[:, -1],
+            'available': ~np.isnan(metrics[:, 0]),
+            'start_prices': start_prices[p],
+            'end_prices': state.last_price.copy(),
+            'days': pd.DatetimeIndex(np.array(days, dtype='datetime64[ns]')),
+            'day_prices': np.array(day_prices).reshape(len(days), len(tickers)),
+        }
+
+    scanner = dataset.scanner(columns=[DATE_COLUMN] + tickers, batch_size=batch_rows,
+                              filter=ds.field(DATE_COLUMN) <= ends[-1] if n_periods else None)
+    previous_date = None
+    for batch in scanner.to_batches():
+        if next_end == n_periods:
+            break
+        count('stream.batches')
+        dates = batch.column(0).to_numpy().astype('datetime64[ns]').view(np.int64)
+        values = np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns[1:]]) \
+            if tickers else np.empty((len(dates), 0))
+        for date, row in zip(dates, values):
+            if previous_date is not None and date < previous_date:
+                raise ValueError('the price store is not in date order')
+            previous_date = date
+            # Dates where none of the tickers traded are not in the in-memory panel either
+            if np.isnan(row).all():
+                continue
+
+            # Everything dated before this row has been read: record starts, emit ends
+            while next_end < n_periods and min(start_events[next_start] if next_start < n_periods else LAST_DATE,
+                                               end_events[next_end]) < date:
+                if next_start < n_periods and start_events[next_start] <= end_events[next_end]:
+                    start_prices[next_start] = state.last_price.copy()
+                    next_start += 1
+                else:
+                    yield period(next_end)
+                    next_end += 1
+                    days, day_prices = [], []
+
+            state.push(date, row)
+            if next_end < n_periods and (next_end > 0 or date >= start_events[0]):
+                days.append(date)
+                day_prices.append(state.last_price.copy())
+
+    # Periods ending after the last row see the last prices
+    while next_end < n_periods:
+        if next_start < n_periods and start_events[next_start] <= end_events[next_end]:
+            start_prices[next_start] = state.last_price.copy()
+            next_start += 1
+        else:
+            yield period(next_end)
+            next_end += 1
+            days, day_prices = [], []
+
+
+# The top-n backtest of backtest.run_backtest (rolling signal) on the stream: yields one
+# record per period with its ranking, return, turnover, portfolio value and daily equity.
+# Periods before any ticker has data are yielded with active False and trade nothing.
+def iter_backtest(tickers, ledger, freq='MS', top_n=10, window=WINDOW, lookbacks=LOOKBACKS, start_date=None,
+                  end_date=None, path=panel_dir, batch_rows=BATCH_ROWS):
+    selected = np.zeros(len(tickers), dtype=bool)
+    for period in stream_periods(tickers, freq, start_date, end_date, window, lookbacks, path, batch_rows):
+        previous_cash = ledger.cash
+        record = {'label': period['label'], 'active': bool(period['available'].any())}
+        if record['active']:
+            top = top_n_positions(np.where(period['available'], period['scores'], np.nan), top_n)
+            in_top = np.zeros(len(tickers), dtype=bool)
+            in_top[top] = True
+            returns = (period['end_prices'] - period['start_prices']) / period['start_prices'] * 100
+            top_returns = returns[top]
+            bought = in_top & ~selected
+            selected = in_top
+            shares = ledger.rebalance(period['label'], in_top, period['start_prices'], period['end_prices'])
+            record.update({
+                'top': [tickers[i] for i in top],
+                'period_return': np.nanmean(top_returns) if np.any(~np.isnan(top_returns)) else np.nan,
+                'turnover': bought.sum() / top.size if top.size else np.nan,
+            })
+        else:
+            shares = ledger.held.copy()
+
+        record['value'] = ledger.value(period['end_prices'])
+        record['invested'] = ledger.invested
+        # Cash from earlier sales plus this period's holdings at each day's last price
+        period_equity = np.nan_to_num(period['day_prices']) @ shares + previous_cash
+        if period_equity.size:
+            period_equity[-1] = record['value']
+        record['equity'] = pd.DataFrame({'Equity': period_equity, 'Invested': ledger.invested},
+                                        index=period['days'].rename('Date'))
+        yield record
+
+
+# Run the stream to the end and collect the result of backtest.run_backtest, plus the
+# rankings (one row of tickers per period) and the blotter
+@profiled
+def streaming_backtest(tickers=None, freq='MS', top_n=10, window=WINDOW, lookbacks=LOOKBACKS, amount=100000,
+                       start_date=None, end_date=None, costs=NO_COSTS, path=panel_dir, batch_rows=BATCH_ROWS):
+    tickers = stream_tickers(open_close_dataset(path), tickers)
+    ledger = PortfolioLedger(len(tickers), amount, costs)
+    records = list(iter_backtest(tickers, ledger, freq, top_n, window, lookbacks, start_date, end_date, path,
+                                 batch_rows))
+    active = [record for record in records if record['active']]
+    labels = [record['label'] for record in active]
+
+    curve = pd.concat([record['equity'] for record in records]) if records else pd.DataFrame(
+        {'Equity': [], 'Invested': []}, index=pd.DatetimeIndex([], name='Date'))
+    blotter = pd.DataFrame(ledger.blotter_arrays(), columns=BLOTTER_COLUMNS)
+    blotter['Ticker'] = np.asarray(tickers, dtype=object)[blotter['Ticker'].to_numpy(dtype=int)]
+    return {
+        'final_amount': records[-1]['value'] if records else 0.0,
+        'period_returns': pd.Series([record['period_return'] for record in active], index=labels, dtype='float64'),
+        'turnover': pd.Series([record['turnover'] for record in active], index=labels, dtype='float64'),
+        'rankings': pd.DataFrame([record['top'] for record in active], index=labels),
+        'blotter': blotter,
+        'equity': curve,
+        'max_drawdown': max_drawdown(curve),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backtest the momentum strategy by streaming the price store')
+    parser.add_argument('--tickers', nargs='+', default=None, help='tickers (default: NSE 500; "all" for the whole store)')
+    parser.add_argument('--freq', default='MS', choices=['MS', 'W-MON'])
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--window', type=int, default=WINDOW)
+    parser.add_argument('--amount', type=float, default=100000)
+    parser.add_argument('--start-date', default=None)
+    parser.add_argument('--end-date', default=None)
+    parser.add_argument('--output', default='stream', help='prefix for the <output>_periods/_equity.parquet files')
+    args = parser.parse_args()
+
+    from momentum.ingest import ensure_panel
+
+    ensure_panel()
+    selected = stream_tickers(open_close_dataset(), None if args.tickers == ['all'] else args.tickers or nse)
+    portfolio = PortfolioLedger(len(selected), args.amount)
+    periods, equity = [], []
+    for result in iter_backtest(selected, portfolio, args.freq, args.top_n, args.window, LOOKBACKS,
+                                args.start_date, args.end_date):
+        equity.append(result['equity'])
+        if result['active']:
+            periods.append({'Period': result['label'], 'Return (%)': result['period_return'],
+                            'Turnover': result['turnover'], 'Value': result['value'],
+                            'Top': ', '.join(result['top'])})
+            print(f"{result['label']}  {result['period_return']:8.2f}%  {result['value']:16,.2f}  "
+                  f"{', '.join(result['top'])}")
+    pd.DataFrame(periods).to_parquet(f'{args.output}_periods.parquet')
+    if equity:
+        curve = pd.concat(equity)
+        curve.to_parquet(f'{args.output}_equity.parquet')
+        print(f'max drawdown {max_drawdown(curve):.2%}')
@@ -0,0 +1,136 @@
+# Parameter sweep over the momentum backtest on a process pool.
+# The aligned close panel is copied into shared memory once and every worker maps it,
+# so no worker reloads prices; each worker also reuses its preparations across configs
+# that only differ in top N or amount. amount is a strategy's amount as in the simulators:
+# monthly configs invest all of it every period, weekly ones amount / 52 every week.
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from constants.config import nse
+from momentum.backtest import prepare_backtest, simulate_backtest
+from momentum.ingest import ensure_panel
+from momentum.metrics import WINDOW
+from momentum.store import load_close
+from momentum.walkforward import STRATEGIES
+
+DEFAULT_GRID = {
+    'signal': ['rolling'],
+    'freq': ['MS'],
+    'top_n': [10],
+    'window': [WINDOW],
+    'lookback_months': [(12, 6, 3)],
+    'amount': [100000],
+}
+
+# Share of `amount` invested per period at each rebalance frequency
+PERIOD_SHARES = {freq: share for _, freq, share in STRATEGIES.values()}
+
+_close = None
+_shm = None
+
+
+# Every combination of the grid axes; window and lookbacks only apply to the rolling signal
+def parameter_grid(grid):
+    axes = {**DEFAULT_GRID, **grid}
+    configs = []
+    for values in itertools.product(*axes.values()):
+        config = dict(zip(axes, values))
+        config['lookback_months'] = tuple(config['lookback_months'])
+        if config['signal'] == 'weekly':
+            config['window'] = None
+            config['lookback_months'] = None
+        if config not in configs:
+            configs.append(config)
+    return configs
+
+
+def _attach(name, shape, index, columns):
+    global _close, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    values = np.ndarray(shape, dtype='float64', buffer=_shm.buf)
+    _close = pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+@lru_cache(maxsize=32)
+def _prepared(signal, freq, window, lookback_months, start_date, end_date):
+    if signal == 'weekly':
+        return prepare_backtest(_close, signal, freq, start_date=start_date, end_date=end_date)
+    lookbacks = [pd.DateOffset(months=months) for months in lookback_months]
+    return prepare_backtest(_close, signal, freq, window, lookbacks, start_date, end_date)
+
+
+def _run(task):
+    config, start_date, end_date = task
+    prepared = _prepared(config['signal'], config['freq'], config['window'], config['lookback_months'],
+                         start_date, end_date)
+    result = simulate_backtest(prepared, config['top_n'], config['amount'] * PERIOD_SHARES[config['freq']])
+    return config, result['final_amount'], result['period_returns'], result['turnover']
+
+
+# Run every config of the grid; returns a summary table (one row per config) and a
+# long table of per-period returns and turnover keyed by config id
+def run_sweep(close, grid, workers=None, start_date=None, end_date=None):
+    configs = parameter_grid(grid)
+    values = np.ascontiguousarray(close.to_numpy(dtype='float64'))
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype='float64', buffer=shm.buf)[:] = values
+        tasks = [(config, start_date, end_date) for config in configs]
+        workers = workers or os.cpu_count()
+        # Group configs that share a preparation so each worker's cache gets reused
+        tasks.sort(key=lambda task: str([task[0][key] for key in ('signal', 'freq', 'window', 'lookback_months')]))
+        with ProcessPoolExecutor(workers, initializer=_attach,
+                                 initargs=(shm.name, values.shape, close.index, close.columns)) as pool:
+            results = list(pool.map(_run, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    summary, periods = [], []
+    for config_id, (config, final_amount, period_returns, turnover) in enumerate(results):
+        total_return = np.prod([1 + r / 100 for r in period_returns if not np.isnan(r)]) - 1
+        summary.append({'Config': config_id, **config, 'Final Amount': final_amount,
+                        'Total Return (%)': total_return * 100, 'Mean Turnover': turnover.mean(),
+                        'Periods': len(period_returns)})
+        periods.append(pd.DataFrame({'Config': config_id, 'Period': period_returns.index,
+                                     'Return (%)': period_returns.values, 'Turnover': turnover.values}))
+    periods = pd.concat(periods, ignore_index=True) if periods else pd.DataFrame()
+    return pd.DataFrame(summary), periods
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sweep momentum backtest parameters over a process pool')
+    parser.add_argument('--signal', nargs='+', default=DEFAULT_GRID['signal'], choices=['rolling', 'weekly'])
+    parser.add_argument('--freq', nargs='+', default=DEFAULT_GRID['freq'], choices=['MS', 'W-MON'])
+    parser.add_argument('--top-n', nargs='+', type=int, default=DEFAULT_GRID['top_n'])
+    parser.add_argument('--window', nargs='+', type=int, default=DEFAULT_GRID['window'])
+    parser.add_argument('--lookbacks', nargs='+', default=['12,6,3'],
+                        help='comma separated lookbacks in months, e.g. 12,6,3 9,6,3')
+    parser.add_argument('--amount', nargs='+', type=float, default=DEFAULT_GRID['amount'])
+    parser.add_argument('--start-date', default=None)
+    parser.add_argument('--end-date', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='sweep', help='prefix for the <output>_summary/_periods.parquet files')
+    args = parser.parse_args()
+
+    grid = {
+        'signal': args.signal,
+        'freq': args.freq,
+        'top_n': args.top_n,
+        'window': args.window,
+        'lookback_months': [tuple(int(m) for m in lookbacks.split(',')) for lookbacks in args.lookbacks],
+        'amount': args.amount,
+    }
+    ensure_panel()
+    summary, periods = run_sweep(load_close(nse), grid, args.workers, args.start_date, args.end_date)
+    summary.to_parquet(f'{args.output}_summary.parquet')
+    periods.to_parquet(f'{args.output}_periods.parquet')
+    print(summary.to_string(index=False))
@@ -0,0 +1,173 @@
+# Walk-forward backtests: the top-N momentum strategy started at every rebalance date of
+# the available history and run for a fixed horizon (a year by default), as many
+# overlapping backtests. Rankings come from one prepare_backtest over the whole history
+# and each period's top N is selected once. Every backtest alive in a period is then
+# rebalanced together as one row of a (starts x tickers) share matrix, so the whole
+# distribution of outcomes costs about one full-history pass.
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from constants.config import nse
+from momentum.backtest import default_range, prepare_backtest, top_n_positions
+from momentum.ingest import ensure_panel
+from momentum.ledger import NO_COSTS
+from momentum.metrics import LOOKBACKS, WINDOW
+from momentum.periods import rebalance_schedule
+from momentum.profiling import profiled, stage
+from momentum.store import load_close
+
+# Strategy 2 and the weekly strategy: signal, rebalance frequency and the share of
+# `amount` invested per period
+STRATEGIES = {
+    'monthly': ('rolling', 'MS', 1.0),
+    'weekly': ('weekly', 'W-MON', 1 / 52),
+}
+# Periods in the default one-year horizon
+HORIZONS = {'MS': 12, 'W-MON': 52}
+OUTCOME_COLUMNS = ['Final Amount', 'Invested', 'Total Return (%)', 'CAGR (%)', 'Max Drawdown (%)', 'Hit Rate (%)']
+
+
+# Each period's top n (selection mask) and the average return of those names
+def period_selections(prepared, top_n):
+    n_periods, n_tickers = prepared['scores'].shape
+    selected = np.zeros((n_periods, n_tickers), dtype=bool)
+    top_returns = np.full(n_periods, np.nan)
+    for p in np.flatnonzero(prepared['available'].any(axis=1)):
+        top = top_n_positions(np.where(prepared['available'][p], prepared['scores'][p], np.nan), top_n)
+        selected[p, top] = True
+        returns = prepared['returns'][p, top]
+        if np.any(~np.isnan(returns)):
+            top_returns[p] = np.nanmean(returns)
+    return selected, top_returns
+
+
+# Run the strategy from every start period for `horizon` periods (the rest of the history
+# when 0). Returns one row of outcomes per start, the same numbers run_backtest reports for
+# that range: final amount, contributions, time-weighted total return and CAGR, maximum
+# drawdown, and the share of periods where the top N went up.
+@profiled
+def walk_forward(close, signal='rolling', freq='MS', top_n=10, horizon=None, amount=100000, costs=NO_COSTS,
+                 window=WINDOW, lookbacks=LOOKBACKS, start_date=None, end_date=None):
+    start_date = close.index[0].normalize() if start_date is None else start_date
+    start_date, end_date = default_range(close, start_date, end_date)
+    starts, ends = rebalance_schedule(freq, start_date, end_date)
+    prepared = prepare_backtest(close, signal, freq, window, lookbacks, start_date, end_date)
+    with stage('selections'):
+        selected, top_returns = period_selections(prepared, top_n)
+
+    n_periods, n_tickers = selected.shape
+    active = selected.any(axis=1)
+    horizon = HORIZONS[freq] if horizon is None else horizon
+    first_periods = np.array([s for s in range(n_periods) if active[s] and (not horizon or s + horizon <= n_periods)],
+                             dtype=int)
+    last_periods = first_periods + horizon - 1 if horizon else np.full(len(first_periods), n_periods - 1)
+    n_starts = len(first_periods)
+
+    # Daily closes, and which rows of the panel fall into each period (as in equity_curve)
+    index = close.index.values.astype('datetime64[ns]')
+    filled = np.nan_to_num(close.ffill().to_numpy(dtype='float64'))
+    first_row = np.searchsorted(index, starts.values.astype('datetime64[ns]'), side='left')
+    last_row = np.searchsorted(index, ends.values.astype('datetime64[ns]'), side='right')
+
+    held = np.zeros((n_starts, n_tickers))
+    cash = np.zeros(n_starts)
+    invested = np.zeros(n_starts)
+    value = np.zeros(n_starts)
+    # Time-weighted unit value, its running peak and the deepest drawdown so far
+    units = np.ones(n_starts)
+    peaks = np.ones(n_starts)
+    drawdown = np.zeros(n_starts)
+    previous_equity = np.zeros(n_starts)
+
+    with stage('walk_forward_periods'):
+        for p in range(n_periods):
+            alive = (first_periods <= p) & (last_periods >= p)
+            if not alive.any():
+                continue
+            rows = np.flatnonzero(alive)
+            shares = held[rows]
+            previous_cash = cash[rows]
+            previous_invested = invested[rows]
+
+            if active[p]:
+                in_top = selected[p]
+                sold = (shares > 0) & ~in_top
+                sell_price = np.nan_to_num(costs.execution_price(prepared['end_prices'][p], 'sell'))
+                proceeds = np.where(sold, shares * sell_price, 0)
+                buy_price = costs.execution_price(prepared['start_prices'][p], 'buy')
+                bought = (shares == 0) & (in_top & ~np.isnan(buy_price))
+                spend = amount / np.count_nonzero(in_top)
+                shares = np.where(bought, (spend - costs.fees(spend)) / np.where(bought, buy_price, 1), shares)
+                cash[rows] += (proceeds - costs.fees(proceeds)).sum(axis=1)
+                invested[rows] += bought.sum(axis=1) * spend
+                held[rows] = np.where(sold, 0, shares)
+            value[rows] = cash[rows] + np.nan_to_num(held[rows] * prepared['end_prices'][p]).sum(axis=1)
+
+            # Daily equity of every alive backtest, then its time-weighted growth
+            begin = last_row[p - 1] if p else first_row[p]
+            if last_row[p] <= begin:
+                continue
+            equity = filled[begin:last_row[p]] @ shares.T + previous_cash
+            equity[-1] = value[rows]
+            # Backtests starting now only begin on their start date
+            new = first_periods[rows] == p
+            equity[:, new] = np.where(index[begin:last_row[p], None] >= starts[p].to_datetime64(), equity[:, new], 0)
+            flows = np.zeros_like(equity)
+            flows[0] = invested[rows] - previous_invested
+            before = np.vstack([previous_equity[rows], equity[:-1]])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                growth = np.where(before > 0, (equity - flows) / before, 1.0)
+            path = units[rows] * np.cumprod(growth, axis=0)
+            running_peak = np.maximum(np.maximum.accumulate(path, axis=0), peaks[rows])
+            drawdown[rows] = np.minimum(drawdown[rows], (path / running_peak - 1).min(axis=0))
+            units[rows] = path[-1]
+            peaks[rows] = running_peak[-1]
+            previous_equity[rows] = equity[-1]
+
+    years = (ends[last_periods] - starts[first_periods]).days.values / 365.25 if n_starts else np.array([])
+    hits = np.array([np.mean(top_returns[s:e + 1][~np.isnan(top_returns[s:e + 1])] > 0) * 100
+                     if np.any(~np.isnan(top_returns[s:e + 1])) else np.nan
+                     for s, e in zip(first_periods, last_periods)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(years > 0, units ** (1 / np.where(years > 0, years, 1)) - 1, np.nan) * 100
+    return pd.DataFrame({
+        'Start': starts[first_periods],
+        'End': ends[last_periods],
+        'Final Amount': value,
+        'Invested': invested,
+        'Total Return (%)': (units - 1) * 100,
+        'CAGR (%)': cagr,
+        'Max Drawdown (%)': drawdown * 100,
+        'Hit Rate (%)': hits,
+    }, index=pd.Index([prepared['labels'][s] for s in first_periods], name='Period'))
+
+
+# Distribution of the walk-forward outcomes across start dates
+def outcome_distribution(outcomes, percentiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    return outcomes[OUTCOME_COLUMNS].describe(percentiles=list(percentiles)).transpose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the momentum strategies from every start date in the history')
+    parser.add_argument('--strategy', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--horizon', type=int, default=None,
+                        help='periods per backtest (default: one year; 0 runs each to the end of the history)')
+    parser.add_argument('--amount', type=float, default=100000)
+    parser.add_argument('--start-date', default=None, help='first start date (default: start of the history)')
+    parser.add_argument('--end-date', default=None)
+    parser.add_argument('--output', default='walkforward', help='prefix for the <output>_<strategy>.parquet files')
+    args = parser.parse_args()
+
+    ensure_panel()
+    close = load_close(nse)
+    for strategy in args.strategy:
+        signal, freq, share = STRATEGIES[strategy]
+        outcomes = walk_forward(close, signal, freq, args.top_n, args.horizon, args.amount * share,
+                                start_date=args.start_date, end_date=args.end_date)
+        outcomes.to_parquet(f'{args.output}_{strategy}.parquet')
+        print(f'{strategy}: {len(outcomes)} backtests')
+        print(outcome_distribution(outcomes).to_string())
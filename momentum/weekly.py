@@ -0,0 +1,146 @@
+# Weekly return statistics (mean, std dev, Return to Risk Ratio) kept as running sums
+# per ticker, so stepping the weekly strategy forward one week costs O(tickers).
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from momentum.memory import column_chunks
+from momentum.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_COLUMNS = ['Average Weekly Return (%)', 'Weekly Std Dev (%)', 'Return to Risk Ratio']
+# Full-size float64 working arrays WeeklyStats allocates, for sizing column chunks
+WEEKLY_ARRAYS = 5
+
+
+# Calculate Weekly Returns and Risk to Return Ratio for a single ticker (reference for WeeklyStats)
+@profiled
+def calculate_weekly_returns(data, ticker):
+    try:
+        # Resample to weekly frequency
+        weekly_data = data['Close'].resample('W').last()
+
+        # Calculate weekly returns
+        weekly_returns = weekly_data.pct_change().dropna() * 100
+
+        # Calculate the average weekly return
+        avg_weekly_return = weekly_returns.mean()
+
+        # Calculate the weekly standard deviation
+        weekly_std_dev = weekly_returns.std()
+
+        # Calculate the return-to-risk ratio
+        return_to_risk_ratio = avg_weekly_return / weekly_std_dev if weekly_std_dev != 0 else np.nan
+
+        return {
+            'Ticker': ticker,
+            'Average Weekly Return (%)': avg_weekly_return,
+            'Weekly Std Dev (%)': weekly_std_dev,
+            'Return to Risk Ratio': return_to_risk_ratio
+        }
+    except Exception as e:
+        logger.error(f"Error calculating weekly returns for {ticker}: {e}")
+        return None
+
+
+# Streaming equivalent of calculate_weekly_returns(data.loc[:cutoff]) for every ticker.
+# Weekly closes follow resample('W'): Monday-Sunday calendar weeks labelled by the Sunday.
+# Completed weeks are folded into Welford mean/variance sums once; the week containing the
+# cutoff is only partially known, so its return is added to a copy of the sums per query.
+# The weekly closes and the forward-filled panel can be passed in when already computed.
+class WeeklyStats:
+    def __init__(self, close, weekly=None, filled=None):
+        self.tickers = list(close.columns)
+        weekly = close.resample('W').last() if weekly is None else weekly
+        self.labels = weekly.index.values.astype('datetime64[ns]')
+        self.weekly = weekly.to_numpy(dtype='float64')
+
+        values = close.to_numpy(dtype='float64')
+        self.index = close.index.values.astype('datetime64[ns]')
+        self.filled = close.ffill().to_numpy(dtype='float64') if filled is None else filled
+        self.last_row = np.maximum.accumulate(
+            np.where(~np.isnan(values), np.arange(len(values))[:, None], -1), axis=0)
+
+        n_tickers = len(self.tickers)
+        self.count = np.zeros(n_tickers)
+        self.mean = np.zeros(n_tickers)
+        self.m2 = np.zeros(n_tickers)
+        # Weeks before this one have had their return folded in
+        self.next_week = 1
+        self.cutoff = None
+
+    # Fold one completed week's return into the running sums
+    def _fold(self, week):
+        weekly_return = (self.weekly[week] / self.weekly[week - 1] - 1) * 100
+        valid = ~np.isnan(weekly_return)
+        self.count += valid
+        delta = np.where(valid, weekly_return - self.mean, 0)
+        self.mean += np.where(valid, delta / np.maximum(self.count, 1), 0)
+        self.m2 += np.where(valid, delta * (np.nan_to_num(weekly_return) - self.mean), 0)
+
+    # Move forward to cutoff and return (mean, std dev, ratio) arrays over the tickers
+    def advance(self, cutoff):
+        cutoff = pd.Timestamp(cutoff)
+        if self.cutoff is not None and cutoff < self.cutoff:
+            raise ValueError(f'WeeklyStats only moves forward, got {cutoff} after {self.cutoff}')
+        self.cutoff = cutoff
+
+        # The week containing the cutoff and everything before it
+        label = pd.offsets.Week(weekday=6).rollforward(cutoff.normalize())
+        week = np.searchsorted(self.labels, label.to_datetime64())
+        while self.next_week < min(week, len(self.labels)):
+            self._fold(self.next_week)
+            self.next_week += 1
+
+        # Last close of the partial week, if the ticker traded in it before the cutoff
+        row = np.searchsorted(self.index, cutoff.to_datetime64(), side='right') - 1
+        partial = np.full(len(self.tickers), np.nan)
+        previous = np.full(len(self.tickers), np.nan)
+        if row >= 0:
+            last_row = self.last_row[row]
+            in_week = (last_row >= 0) & (self.index[np.maximum(last_row, 0)] >= (label - pd.Timedelta(days=6)).to_datetime64())
+            partial = np.where(in_week, self.filled[row], np.nan)
+        if 1 <= week <= len(self.labels):
+            previous = self.weekly[week - 1]
+        partial_return = (partial / previous - 1) * 100
+
+        # Add the partial week to a copy of the sums
+        valid = ~np.isnan(partial_return)
+        count = self.count + valid
+        delta = np.where(valid, partial_return - self.mean, 0)
+        mean = self.mean + np.where(valid, delta / np.maximum(count, 1), 0)
+        m2 = self.m2 + np.where(valid, delta * (np.nan_to_num(partial_return) - mean), 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, mean, np.nan)
+            std_dev = np.where(count > 1, np.sqrt(np.maximum(m2, 0) / (count - 1)), np.nan)
+            ratio = np.where(std_dev != 0, mean / std_dev, np.nan)
+        return mean, std_dev, ratio
+
+    # advance() as the familiar per-ticker weekly stats table
+    def table(self, cutoff):
+        return weekly_table(np.column_stack(self.advance(cutoff)), self.tickers)
+
+
+# Weekly stats at each of the (ascending) cutoffs, shape (cutoffs, tickers, 3);
+# in column chunks under a memory budget
+@profiled
+def weekly_stats(close, cutoffs):
+    return np.concatenate([_weekly_stats(close.iloc[:, chunk], cutoffs)
+                           for chunk in column_chunks(*close.shape, WEEKLY_ARRAYS)], axis=1)
+
+
+def _weekly_stats(close, cutoffs):
+    stats = WeeklyStats(close)
+    return np.array([np.column_stack(stats.advance(cutoff)) for cutoff in cutoffs]).reshape(
+        len(cutoffs), close.shape[1], len(WEEKLY_COLUMNS))
+
+
+# One cutoff of weekly_stats as the per-ticker weekly stats table
+def weekly_table(stats, tickers):
+    table = pd.DataFrame(stats, columns=WEEKLY_COLUMNS)
+    table.insert(0, 'Ticker', list(tickers))
+    return table
@@ -0,0 +1,41 @@
+# A small synthetic universe shared by the tests: 24 tickers over three years of sessions,
+# some listing part way through and some with missing sessions, written as a price panel.
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_universe
+from momentum.store import load_close, write_panel
+
+
+@pytest.fixture(scope='session')
+def panel_path(tmp_path_factory):
+    frames = {}
+    for ticker, frame in synthetic_universe(24, 3, end_date='2024-07-26', seed=7, late_listing=0.25, missing=0.02):
+        # Stored as the snapshots are read: IST midnight as naive UTC
+        frame.index = frame.index.tz_convert(None).astype('datetime64[ns]')
+        frames[ticker] = frame
+    path = str(tmp_path_factory.mktemp('panel'))
+    write_panel(frames, path)
+    return path
+
+
+@pytest.fixture(scope='session')
+def close(panel_path):
+    return load_close(path=panel_path)
+
+
+# Cutoff dates to check the kernels at: before most tickers have a week of history, part
+# way through, on a non-trading day and at the end of the panel
+@pytest.fixture(scope='session')
+def cutoffs(close):
+    return [close.index[0] + pd.Timedelta(days=3), close.index[len(close) // 3], pd.Timestamp('2023-12-31'),
+            close.index[-2], close.index[-1]]
+
+
+# One ticker's prices up to a date in the per-ticker layout the reference implementations take
+@pytest.fixture(scope='session')
+def ticker_data(close):
+    def data(ticker, date):
+        return close[ticker].loc[:date].dropna().to_frame('Close')
+    return data
@@ -0,0 +1,43 @@
+# Prices downloaded through the yfinance provider merged into histories built from the
+# snapshot CSVs: re-sent bars must land on the stored dates and replace them.
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_universe, write_universe
+from momentum.fetch import YFinanceProvider
+from momentum.ingest import ingest_frames, ingest_snapshots, read_history
+
+
+# Bars shaped like yf.download(group_by='ticker', multi_level_index=True) returns them: daily
+# bars at IST midnight, with the timezone dropped unless ignore_tz=False (the yfinance default
+# for daily bars is to drop it)
+def fake_download(frames):
+    def download(tickers, ignore_tz=True, **kwargs):
+        data = pd.concat({ticker: frames[ticker] for ticker in tickers}, axis=1)
+        if ignore_tz:
+            data.index = data.index.tz_localize(None)
+        return data
+    return download
+
+
+def test_downloaded_bars_replace_snapshot_bars(tmp_path, monkeypatch):
+    yf = pytest.importorskip('yfinance')
+    (ticker, snapshot), = synthetic_universe(1, 1, end_date='2024-07-26', seed=3)
+    write_universe([(ticker, snapshot)], str(tmp_path / 'snapshots'))
+    histories = str(tmp_path / 'history')
+    ingest_snapshots(str(tmp_path / 'snapshots'), histories)
+    stored = read_history(ticker, histories)
+
+    # The last 20 sessions again with revised closes, and two new sessions
+    (_, later), = synthetic_universe(1, 1, end_date='2024-07-30', seed=3)
+    later = later.iloc[-22:].copy()
+    later['Close'] += 1.0
+    monkeypatch.setattr(yf, 'download', fake_download({ticker: later}))
+    bars = YFinanceProvider().fetch([ticker])
+    assert ingest_frames(bars, histories) == [ticker]
+
+    history = read_history(ticker, histories)
+    expected_dates = stored.index.union(later.index.tz_convert(None))
+    assert history.index.equals(expected_dates)
+    assert (history['Close'].iloc[-22:].to_numpy() == later['Close'].to_numpy()).all()
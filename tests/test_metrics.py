@@ -0,0 +1,20 @@
+# rolling_metrics against the per-ticker calculate_returns it replaces
+
+import numpy as np
+import pytest
+
+from momentum.metrics import METRIC_COLUMNS, calculate_returns, rolling_metrics
+
+
+@pytest.mark.parametrize('window', [252, 60])
+def test_rolling_metrics_matches_calculate_returns(close, cutoffs, ticker_data, window):
+    metrics = rolling_metrics(close, cutoffs, window)
+    for i, date in enumerate(cutoffs):
+        for j, ticker in enumerate(close.columns):
+            data = ticker_data(ticker, date)[-window:]
+            if data.empty:
+                assert np.isnan(metrics[i, j]).all()
+                continue
+            expected = calculate_returns(data, ticker)
+            np.testing.assert_allclose(metrics[i, j], [expected[column] for column in METRIC_COLUMNS],
+                                       rtol=1e-9, atol=1e-12, err_msg=f'{ticker} at {date}')
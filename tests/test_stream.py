@@ -0,0 +1,18 @@
+# streaming_backtest, reading the panel from disk, against run_backtest on the loaded panel
+
+import pandas as pd
+import pytest
+
+from momentum.backtest import run_backtest
+from momentum.stream import streaming_backtest
+
+
+@pytest.mark.parametrize('freq', ['MS', 'W-MON'])
+def test_streaming_backtest_matches_run_backtest(close, panel_path, freq):
+    expected = run_backtest(close, freq=freq, top_n=5)
+    streamed = streaming_backtest(freq=freq, top_n=5, path=panel_path, batch_rows=50)
+    assert streamed['final_amount'] == pytest.approx(expected['final_amount'], rel=1e-12)
+    pd.testing.assert_series_equal(streamed['period_returns'], expected['period_returns'])
+    pd.testing.assert_series_equal(streamed['turnover'], expected['turnover'])
+    pd.testing.assert_frame_equal(streamed['equity'], expected['equity'], check_freq=False)
+    assert streamed['max_drawdown'] == pytest.approx(expected['max_drawdown'])
@@ -0,0 +1,18 @@
+# weekly_stats against the resample-based calculate_weekly_returns it replaces
+
+import numpy as np
+
+from momentum.weekly import WEEKLY_COLUMNS, calculate_weekly_returns, weekly_stats
+
+
+def test_weekly_stats_matches_calculate_weekly_returns(close, cutoffs, ticker_data):
+    stats = weekly_stats(close, cutoffs)
+    for i, date in enumerate(cutoffs):
+        for j, ticker in enumerate(close.columns):
+            data = ticker_data(ticker, date)
+            if data.empty:
+                assert np.isnan(stats[i, j]).all()
+                continue
+            expected = calculate_weekly_returns(data, ticker)
+            np.testing.assert_allclose(stats[i, j], [expected[column] for column in WEEKLY_COLUMNS],
+                                       rtol=1e-9, atol=1e-12, err_msg=f'{ticker} at {date}')